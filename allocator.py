@@ -1,92 +1,314 @@
-from models import db, Room, Class, TimetableEntry, CancelledClass
-from utils.normalize import normalize_slot
-from datetime import date
+from models import db, Room, Class, TimetableEntry, LabRoomBooking
+from timeslots import slot_table
+from bisect import bisect_left
+from collections import namedtuple
+from room_assignment import solve_slots
+from grid_cache import invalidate_floating_grid
+from export_cache import bump_timetable_version
+from dashboard_stats import refresh_dashboard_stats
 
 
-def allocate_rooms():
+class OccupancyIndex:
+    """
+    Free rooms per (day, slot), kept as a bitmap over the rooms
+    sorted by capacity. Bit i is set while the i-th smallest room is free.
+    """
 
-    print("\n========== ALLOCATOR START ==========")
+    def __init__(self, rooms):
 
-    today = date.today()
-    cancelled = CancelledClass.query.filter(
-    CancelledClass.date >= today
-).all()
+        rooms = sorted(rooms, key=lambda r: (r[1], r[0]))
 
-    for c in cancelled:
+        self.room_ids = [room_id for room_id, _ in rooms]
+        self.capacities = [capacity for _, capacity in rooms]
+        self.position = {room_id: i for i, room_id in enumerate(self.room_ids)}
+        self.all_free = (1 << len(rooms)) - 1
+        self.free = {}
 
-        cancel_day = c.date.strftime("%A").upper()
+    def occupy(self, key, room_id):
 
-        entries = TimetableEntry.query.filter_by(
-            class_id=c.class_id
-        ).all()
+        i = self.position.get(room_id)
 
-        for e in entries:
+        if i is None:
+            return
 
-            slot = normalize_slot(e.slot)
+        self.free[key] = self.free.get(key, self.all_free) & ~(1 << i)
 
-            if slot == normalize_slot(c.slot) and e.day == cancel_day:
+    def free_rooms(self, key):
+        """Returns the free rooms for key as (room_id, capacity) pairs."""
 
-                if e.room_id is not None:
-                    print(
-                        f"❌ Cancelled | {e.class_obj.name} | {cancel_day} {slot} | freeing room {e.room.name}"
-                    )
+        free = self.free.get(key, self.all_free)
 
-                e.room_id = None
+        return [
+            (room_id, capacity)
+            for i, (room_id, capacity) in enumerate(
+                zip(self.room_ids, self.capacities)
+            )
+            if free >> i & 1
+        ]
 
-    db.session.commit()
-    floating_allocated = TimetableEntry.query.filter(
-        TimetableEntry.is_floating == True,
-        TimetableEntry.room_id != None
-    ).all()
+    def take_smallest(self, key, strength):
+        """
+        Marks the smallest free room with capacity >= strength as used
+        and returns its id, or None if nothing fits.
+        """
 
-    for e in floating_allocated:
-        e.room_id = None
+        start = bisect_left(self.capacities, strength)
+        free = self.free.get(key, self.all_free)
+        candidates = free >> start
 
-    db.session.commit()
+        if not candidates:
+            return None
+
+        i = start + (candidates & -candidates).bit_length() - 1
+        self.free[key] = free & ~(1 << i)
+
+        return self.room_ids[i]
+
+
+class Snapshot:
+    """
+    Everything the allocator reads, as plain tuples: rooms as
+    (room_id, capacity), class strengths, entries as EntryRow and the
+    rooms lab sessions use as LabRow. Names are kept only for logging and
+    reports. A snapshot is picklable, so it can be handed to worker
+    processes.
+    """
+
+    def __init__(self, rooms, strengths, entries, labs=(),
+                 class_names=None, room_names=None):
+
+        self.rooms = rooms
+        self.strengths = strengths
+        self.entries = entries
+        self.labs = labs
+        self.class_names = class_names or {}
+        self.room_names = room_names or {}
+
+
+EntryRow = namedtuple(
+    "EntryRow",
+    "id class_id day_code slot_code room_id is_floating is_lab_hour"
+)
+
+
+# one room held by a lab session, from lab_room_booking
+LabRow = namedtuple("LabRow", "class_id day_code slot_code room_id")
+
+
+def slot_key(entry):
+    return (entry.day_code, entry.slot_code)
 
-    floating_entries = TimetableEntry.query.filter(
-        TimetableEntry.is_floating == True,
-        TimetableEntry.is_lab_hour == False
-    ).all()
 
-    available_rooms = Room.query.order_by(Room.capacity).all()
-    occupied = set()
+def load_snapshot(changed_slots=None):
+    """
+    Reads a Snapshot with one query per table. changed_slots, a set of
+    (day_code, slot_code), limits the entries to the days it touches.
+    """
 
-    for e in TimetableEntry.query.filter(
-        TimetableEntry.room_id != None,
-        TimetableEntry.is_floating == False
-    ):
+    rooms = db.session.query(Room.id, Room.name, Room.capacity).all()
+    classes = db.session.query(Class.id, Class.name, Class.strength).all()
 
-        slot = normalize_slot(e.slot)
+    query = db.session.query(
+        TimetableEntry.id,
+        TimetableEntry.class_id,
+        TimetableEntry.day_code,
+        TimetableEntry.slot_code,
+        TimetableEntry.room_id,
+        TimetableEntry.is_floating,
+        TimetableEntry.is_lab_hour
+    )
 
-        occupied.add((e.day, slot, e.room_id))
+    if changed_slots is not None:
+        query = query.filter(
+            TimetableEntry.day_code.in_({day for day, _ in changed_slots})
+        )
 
+    entries = [EntryRow(*row) for row in query.order_by(TimetableEntry.id)]
+    by_id = {e.id: e for e in entries}
+
+    # bookings resolved against the entries already read; a room booked
+    # by several teachers of one lab session is held once
+    labs = {
+        LabRow(e.class_id, e.day_code, e.slot_code, room_id)
+        for entry_id, room_id in db.session.query(
+            LabRoomBooking.entry_id, LabRoomBooking.room_id
+        )
+        if (e := by_id.get(entry_id)) is not None
+    }
+
+    return Snapshot(
+        rooms=[(room_id, capacity) for room_id, _, capacity in rooms],
+        strengths={class_id: strength for class_id, _, strength in classes},
+        entries=entries,
+        labs=list(labs),
+        class_names={class_id: name for class_id, name, _ in classes},
+        room_names={room_id: name for room_id, name, _ in rooms}
+    )
+
+
+def _allocate_greedy(index, floating_entries, strengths):
+
+    assigned = {}
+
+    for entry in floating_entries:
+
+        room_id = index.take_smallest(
+            slot_key(entry),
+            strengths[entry.class_id]
+        )
+
+        if room_id is not None:
+            assigned[entry.id] = room_id
+
+    return assigned
+
+
+def _allocate_optimal(index, floating_entries, strengths, workers):
+
+    by_slot = {}
 
     for entry in floating_entries:
+        by_slot.setdefault(slot_key(entry), []).append(
+            (entry.id, strengths[entry.class_id])
+        )
+
+    return solve_slots(
+        (
+            (key, slot_entries, index.free_rooms(key))
+            for key, slot_entries in by_slot.items()
+        ),
+        workers=workers
+    )
+
+
+def plan_rooms(snapshot, cancelled=None, changed_slots=None,
+               strategy="greedy", workers=None):
+    """
+    Runs the allocator on a snapshot without touching the database.
 
-        slot = normalize_slot(entry.slot)
+    cancelled is a set of (class_id, day_code, slot_code) to plan around,
+    empty for the weekly template. Cancelled entries lose their room,
+    floating entries are cleared and non-lab ones are placed again around
+    the rooms that fixed entries and lab sessions hold.
 
-        cls = Class.query.get(entry.class_id)
+    Returns {entry_id: room_id or None} for every entry whose room the
+    allocator decides; all other entries keep the room they have.
+    """
 
-        for room in available_rooms:
-            
-            if room.capacity < cls.strength:
-                continue
+    if cancelled is None:
+        cancelled = set()
 
-            key = (entry.day, slot, room.id)
+    index = OccupancyIndex(snapshot.rooms)
 
-            if key in occupied:
-                continue
+    rooms = {}
+    floating_entries = []
 
-            entry.room_id = room.id
-            occupied.add(key)
+    for e in snapshot.entries:
 
+        key = slot_key(e)
+
+        if changed_slots is not None and key not in changed_slots:
+            continue
+
+        if (e.class_id, e.day_code, e.slot_code) in cancelled:
+            rooms[e.id] = None
+            continue
+
+        if e.is_floating:
+
+            rooms[e.id] = None
+
+            if not e.is_lab_hour:
+                floating_entries.append(e)
+
+        elif e.room_id is not None:
+            index.occupy(key, e.room_id)
+
+    for lab in snapshot.labs:
+
+        key = slot_key(lab)
+
+        if changed_slots is not None and key not in changed_slots:
+            continue
+
+        if (lab.class_id, lab.day_code, lab.slot_code) not in cancelled:
+            index.occupy(key, lab.room_id)
+
+    if strategy == "greedy":
+        assigned = _allocate_greedy(index, floating_entries, snapshot.strengths)
+    elif strategy == "optimal":
+        assigned = _allocate_optimal(
+            index, floating_entries, snapshot.strengths, workers
+        )
+    else:
+        raise ValueError(f"Unknown allocation strategy: {strategy}")
+
+    rooms.update(assigned)
+
+    return rooms
+
+
+def allocate_rooms(changed_slots=None, strategy="greedy", workers=None):
+    """
+    Allocates free rooms to floating classes in the weekly template,
+    TimetableEntry.room_id. Cancellations are not applied here; the rooms
+    they free on each date are handed out by horizon.allocate_dates().
+
+    changed_slots is an optional iterable of (day, slot) labels. When given,
+    only those slots are recomputed and every other assignment is left
+    as it is. Each (day, slot) is allocated independently, so this gives
+    the same result as a full run.
+
+    strategy is "greedy" (first fit in entry order, the fast default) or
+    "optimal" (min-cost assignment per slot, see room_assignment.py).
+    workers caps the process pool used by the optimal strategy.
+
+    The plan comes from plan_rooms() and only entries whose room changes
+    are written, in one commit.
+    """
+
+    print("\n========== ALLOCATOR START ==========")
+
+    if changed_slots is not None:
+        changed_slots = {slot_table.key(day, slot) for day, slot in changed_slots}
+
+        if not changed_slots:
+            print("\n========== ALLOCATOR END ==========")
+            return
+
+    snapshot = load_snapshot(changed_slots)
+
+    rooms = plan_rooms(
+        snapshot,
+        changed_slots=changed_slots,
+        strategy=strategy,
+        workers=workers
+    )
+
+    updates = []
+
+    for e in snapshot.entries:
+
+        if e.id not in rooms:
+            continue
+
+        room_id = rooms[e.id]
+
+        if room_id is not None:
             print(
-                f"✔ Allocated | {cls.name} | {entry.day} {slot} | {room.name}"
+                f"✔ Allocated | {snapshot.class_names[e.class_id]} | {slot_table.day_label(e.day_code)} {slot_table.slot_label(e.slot_code)} | {snapshot.room_names[room_id]}"
             )
 
-            break
+        if room_id != e.room_id:
+            updates.append({"id": e.id, "room_id": room_id})
+
+    if updates:
+        db.session.bulk_update_mappings(TimetableEntry, updates)
 
+    bump_timetable_version()
     db.session.commit()
 
-    print("\n========== ALLOCATOR END ==========")
\ No newline at end of file
+    invalidate_floating_grid()
+    refresh_dashboard_stats()
+
+    print("\n========== ALLOCATOR END ==========")
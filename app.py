@@ -1,30 +1,49 @@
 from flask import (
     Flask, render_template, request,
-    redirect, url_for, flash, session, abort, send_file
+    redirect, url_for, flash, session, abort, send_file, jsonify
 )
-import io
 import os
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font
-from collections import defaultdict
-from functools import wraps
-from datetime import datetime
+import shutil
+import tempfile
+from functools import partial, wraps
+from datetime import datetime, timedelta
 from io import BytesIO
 import pandas as pd
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from models import (
-    db, User, Class, Room, Subject,
-    TimetableEntry, CancelledClass, TeachingAssignment,Teacher
+    db, User, Class, Subject,
+    TimetableEntry, CancelledClass, TeachingAssignment,Teacher, Job
 )
 
-from input_processor import process_inputs, process_lab_rooms
+from input_processor import process_inputs, provision_users
+from workbook_loader import UPLOAD_FILES, CACHE_DIR, load_workbooks
 from allocator import allocate_rooms
+from horizon import allocate_dates, dates_in_slots, week_start, week_dates
+from simulation import simulate
+from conflicts import find_conflicts
+from jobs import (
+    create_job, start_job, fail_job, fail_stale_jobs, schedule_daily
+)
+from migrations import run_migrations
+from grid_cache import get_floating_grid
+from faculty_directory import search_faculty
+from dashboard_stats import get_dashboard_stats
+from queries import (
+    timetable_entries, teacher_entries, class_entries, room_overrides
+)
+from cancellations import cancellation_index
+from exporter import XLSX_MIMETYPE, export_timetables, owners
+from export_cache import timetable_version, export_etag, cached_export
+from timeslots import TIME_SLOTS, DAYS, slot_table
 from utils.normalize import normalize_slot
 
 app = Flask(__name__)
 app.secret_key = "floated-secret"
 
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///database.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+    "DATABASE_URL", "sqlite:///database.db"
+)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 UPLOAD_FOLDER = "uploads"
@@ -33,20 +52,6 @@ app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 
 db.init_app(app)
 
-TIME_SLOTS = list(map(normalize_slot, [
-    "8.00-8.45",
-    "9.10-9.55",
-    "10.00-10.45",
-    "10.50-11.35",
-    "11.55-12.40",
-    "12.45-1.30"
-]))
-
-DAYS = [
-    "MONDAY", "TUESDAY", "WEDNESDAY",
-    "THURSDAY", "FRIDAY", "SATURDAY"
-]
-
 def login_required(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
@@ -95,72 +100,12 @@ def login():
         flash("Invalid email or password", "error")
 
     return render_template("login.html")
-def get_cancelled_lookup(include_class_name=False):
-    today = datetime.today().date()
-
-    cancelled = CancelledClass.query.filter(
-        CancelledClass.date >= today
-    ).all()
-
-    cancelled_lookup = set()
-
-    for c in cancelled:
-        cancel_day = c.date.strftime("%A").upper()
-        slot = normalize_slot(c.slot)
-
-        if include_class_name:
-            cls = Class.query.get(c.class_id)
-            if cls:
-                cancelled_lookup.add((cls.name, cancel_day, slot))
-        else:
-            cancelled_lookup.add((c.class_id, cancel_day, slot))
-
-    return cancelled_lookup
-
 @app.route("/admin")
 @login_required
 @role_required("admin")
 def admin_dashboard():
 
-    permanent_count = Class.query.filter_by(
-        class_category="permanent"
-    ).count()
-
-    floating_count = Class.query.filter_by(
-        class_category="floating"
-    ).count()
-
-   
-    from sqlalchemy import func, case
-
-    subquery = (
-        db.session.query(
-            TimetableEntry.class_id,
-            TimetableEntry.day,
-            TimetableEntry.slot,
-            func.count(TimetableEntry.id).label("total"),
-            func.sum(
-                case(
-                    (TimetableEntry.room_id.isnot(None), 1),
-                    else_=0
-                )
-            ).label("allocated")
-        )
-        .join(Class, TimetableEntry.class_id == Class.id)
-        .filter(Class.class_category == "floating")
-        .group_by(
-            TimetableEntry.class_id,
-            TimetableEntry.day,
-            TimetableEntry.slot
-        )
-        .subquery()
-    )
-
-    allocated_count = (
-        db.session.query(func.count())
-        .filter(subquery.c.total == subquery.c.allocated)
-        .scalar()
-    )
+    stats = get_dashboard_stats()
 
     recent_cancelled = (
         CancelledClass.query
@@ -171,9 +116,10 @@ def admin_dashboard():
 
     return render_template(
         "home.html",
-        permanent_count=permanent_count,
-        floating_count=floating_count,
-        allocated_count=allocated_count,
+        permanent_count=stats["permanent_count"],
+        floating_count=stats["floating_count"],
+        allocated_count=stats["allocated_count"],
+        stats=stats,
         recent_cancelled=recent_cancelled
     )
 
@@ -185,33 +131,101 @@ def admin_upload():
 
     if request.method == "POST":
 
-        files = {
-            "class_strength": "class_strength.xlsx",
-            "room_mapping": "room_mapping.xlsx",
-            "class_type": "class_type.xlsx",
-            "teacher_subject": "teacher_subject_mapping.xlsx",
-            "parallel_classes": "parallel_classes.xlsx",
-            "student_mapping": "student_mapping.xlsx",
-            "timetables": "timetables.xlsx",
-            "lab_rooms": "lab_rooms.xlsx"
-        }
-
-        for key, filename in files.items():
-
+        for key in UPLOAD_FILES:
             if key not in request.files or request.files[key].filename == "":
                 return f"❌ Missing file: {key}", 400
 
-            request.files[key].save(
-                os.path.join(app.config["UPLOAD_FOLDER"], filename)
-            )
+        # each upload gets its own folder, so a later upload can never
+        # overwrite files a queued or running job has yet to read; the
+        # files are saved before the job exists, so a failed save leaves
+        # no job queued forever
+        jobs_dir = os.path.join(app.config["UPLOAD_FOLDER"], "jobs")
+        os.makedirs(jobs_dir, exist_ok=True)
+        incoming = tempfile.mkdtemp(prefix=".incoming-", dir=jobs_dir)
+
+        try:
+            for key, filename in UPLOAD_FILES.items():
+                request.files[key].save(os.path.join(incoming, filename))
+        except Exception:
+            shutil.rmtree(incoming, ignore_errors=True)
+            raise
+
+        job = create_job("upload")
+        folder = os.path.join(jobs_dir, str(job.id))
+
+        try:
+            # left by a job of a database that reused this id
+            shutil.rmtree(folder, ignore_errors=True)
+            os.replace(incoming, folder)
+            start_job(app, job, partial(run_upload_job, folder))
+        except Exception as e:
+            fail_job(job, f"Could not start the upload: {e}")
+            shutil.rmtree(incoming, ignore_errors=True)
+            shutil.rmtree(folder, ignore_errors=True)
+            raise
+
+        if request.accept_mimetypes.best == "application/json":
+            return jsonify({"job_id": job.id}), 202
+
+        return redirect(url_for("admin_upload", job=job.id))
+
+    return render_template(
+        "admin_upload.html",
+        job_id=request.args.get("job", type=int)
+    )
+
 
-        process_inputs()
-        process_lab_rooms()
-        allocate_rooms()
+def run_upload_job(folder, report):
+
+    try:
+        report(5, "Reading workbooks")
+        frames = load_workbooks(
+            folder,
+            cache_dir=os.path.join(app.config["UPLOAD_FOLDER"], CACHE_DIR)
+        )
+    finally:
+        # read or not, the job's copies of the workbooks are not needed again
+        shutil.rmtree(folder, ignore_errors=True)
+
+    report(30, "Importing timetable and lab rooms")
+    plan = process_inputs(frames, differential=True)
+
+    report(55, "Creating user accounts")
+    provision_users(plan)
+
+    # only the slots the import changed are planned again, unless classes
+    # or rooms changed and every slot has to be
+    changed = plan["changed_slots"]
+
+    report(75, "Allocating rooms")
+    allocate_rooms(None if changed is None else [
+        (slot_table.day_label(day), slot_table.slot_label(slot))
+        for day, slot in changed
+    ])
+
+    report(90, "Allocating dated rooms")
+    allocate_dates(None if changed is None else dates_in_slots(changed))
+
+    report(95, "Checking for conflicts")
+    conflicts = find_conflicts()
+
+    return {"conflicts": conflicts}
+
+
+def run_horizon_job(report):
+
+    report(10, "Allocating dated rooms")
+    allocate_dates()
 
-        return redirect(url_for("view_floating_timetable"))
 
-    return render_template("admin_upload.html")
+@app.route("/admin/jobs/<int:job_id>")
+@login_required
+@role_required("admin")
+def job_status(job_id):
+
+    job = Job.query.get_or_404(job_id)
+
+    return jsonify(job.to_dict())
 
 
 @app.route("/admin/cancel_class", methods=["GET", "POST"])
@@ -230,32 +244,37 @@ def cancel_class():
         slots = request.form.getlist("slots")
         reason = request.form.get("reason")
 
-        cls = Class.query.get(class_id)
-
-        for slot in slots:
-
-            slot = normalize_slot(slot)
+        slots = list(dict.fromkeys(normalize_slot(slot) for slot in slots))
 
-            existing = CancelledClass.query.filter_by(
-                class_id=class_id,
-                slot=slot,
-                date=date
-            ).first()
+        added = []
 
-            if existing:
-                continue
+        if slots:
 
-            cancelled = CancelledClass(
-                class_id=class_id,
-                date=date,
-                slot=slot,
-                reason=reason
-            )
+            # the unique (class_id, slot, date) index drops repeats, and
+            # RETURNING hands back only the rows that were really added
+            added = db.session.scalars(
+                sqlite_insert(CancelledClass)
+                .on_conflict_do_nothing(
+                    index_elements=["class_id", "slot", "date"]
+                )
+                .returning(CancelledClass),
+                [
+                    {
+                        "class_id": class_id,
+                        "date": date,
+                        "slot": slot,
+                        "reason": reason
+                    }
+                    for slot in slots
+                ]
+            ).all()
 
-            db.session.add(cancelled)
         db.session.commit()
 
-        allocate_rooms()
+        for cancelled in added:
+            cancellation_index.add(cancelled)
+
+        allocate_dates([date])
 
         flash("Class cancelled and rooms reallocated!", "success")
 
@@ -266,6 +285,47 @@ def cancel_class():
         classes=classes
     )
 
+@app.route("/admin/simulate", methods=["POST"])
+@login_required
+@role_required("admin")
+def simulate_cancellations():
+    """
+    Dry run of the allocator for hypothetical cancellations. Takes JSON
+    {"scenarios": [[{"class_id", "date", "slot"}, ...], ...]}, or a single
+    scenario as {"cancellations": [...]}, plus an optional "strategy".
+    Nothing is written.
+    """
+
+    data = request.get_json(silent=True) or {}
+
+    scenarios = data.get("scenarios")
+
+    if scenarios is None:
+        scenarios = [data.get("cancellations", [])]
+
+    strategy = data.get("strategy", "greedy")
+
+    if strategy not in ("greedy", "optimal"):
+        return jsonify({"error": f"Unknown strategy: {strategy}"}), 400
+
+    try:
+        scenarios = [
+            [
+                (
+                    int(c["class_id"]),
+                    datetime.strptime(c["date"], "%Y-%m-%d").date(),
+                    normalize_slot(c["slot"])
+                )
+                for c in scenario
+            ]
+            for scenario in scenarios
+        ]
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid cancellation: {e}"}), 400
+
+    return jsonify({"scenarios": simulate(scenarios, strategy=strategy)})
+
+
 @app.route("/admin/cancelled_classes")
 @login_required
 @role_required("admin")
@@ -288,66 +348,64 @@ def delete_cancelled(id):
 
     cancelled = CancelledClass.query.get_or_404(id)
 
-    class_id = cancelled.class_id
-    slot = normalize_slot(cancelled.slot)
-    cancel_day = cancelled.date.strftime("%A").upper()
+    cancel_date = cancelled.date
 
     db.session.delete(cancelled)
     db.session.commit()
 
-    cls = Class.query.get(class_id)
+    cancellation_index.remove(cancelled)
 
-    if cls and cls.class_category == "permanent":
+    # the weekly template never lost the room, re-planning the date
+    # without this cancellation is enough
+    allocate_dates([cancel_date])
 
-        room = Room.query.filter_by(owner_class_id=class_id).first()
+    return redirect(url_for("cancelled_classes"))
+def requested_week():
+    """
+    The week a timetable view shows, from ?week=YYYY-MM-DD (any date in
+    that week) or the current week, as template context: its Monday,
+    the neighbouring weeks and the dates it covers.
+    """
 
-        if room:
-            entries = TimetableEntry.query.filter_by(
-                class_id=class_id,
-                day=cancel_day,
-                slot=slot
-            ).all()
+    try:
+        d = datetime.strptime(request.args.get("week", ""), "%Y-%m-%d").date()
+    except ValueError:
+        d = None
 
-            for e in entries:
-                e.room_id = room.id
+    start = week_start(d)
 
-            db.session.commit()
+    return {
+        "week": start,
+        "prev_week": start - timedelta(weeks=1),
+        "next_week": start + timedelta(weeks=1),
+        "week_dates": week_dates(start)
+    }
 
-    allocate_rooms()
 
-    return redirect(url_for("cancelled_classes"))
 @app.route("/admin/faculty")
 @login_required
 @role_required("admin")
 def faculty_list():
-    teachers = Teacher.query.order_by(Teacher.name).all()
-
-    # derive departments from classes each teacher teaches
-    teacher_departments = {}
-    for t in teachers:
-        classes = (
-            db.session.query(Class.name)
-            .join(TimetableEntry, TimetableEntry.class_id == Class.id)
-            .filter(TimetableEntry.teacher_id == t.id)
-            .distinct()
-            .all()
-        )
-        depts = set()
-        for (cname,) in classes:
-            # e.g. "S8_CSE" -> "CSE", "S6_CSE_A" -> "CSE"
-            parts = cname.replace("-", "_").split("_")
-            if len(parts) >= 2:
-                last = parts[-1].upper()
-                # if last part is a section letter, take the one before it
-                dept = parts[-2].upper() if len(last) == 1 else last
-                if len(dept) > 1:
-                    depts.add(dept)
-        teacher_departments[t.id] = sorted(depts)
+
+    query = request.args.get("q", "").strip()
+    department = request.args.get("dept") or None
+
+    result = search_faculty(
+        query,
+        department,
+        page=request.args.get("page", 1, type=int)
+    )
 
     return render_template(
         "admin_faculty_list.html",
-        teachers=teachers,
-        teacher_departments=teacher_departments
+        teachers=result["items"],
+        total=result["total"],
+        size=result["size"],
+        departments=result["departments"],
+        page=result["page"],
+        pages=result["pages"],
+        query=query,
+        department=department
     )
 
 @app.route("/admin/faculty/<int:teacher_id>")
@@ -358,21 +416,23 @@ def faculty_timetable(teacher_id):
     teacher = Teacher.query.get_or_404(teacher_id)
 
     entries = (
-        TimetableEntry.query
+        timetable_entries(TimetableEntry.teacher_id == teacher.id)
         .join(Subject)
         .join(Class)
-        .filter(TimetableEntry.teacher_id == teacher.id)
-        .order_by(TimetableEntry.day, TimetableEntry.slot)
+        .order_by(TimetableEntry.day_code, TimetableEntry.slot_code)
         .all()
     )
-    cancelled_lookup = get_cancelled_lookup()
-    
+    week = requested_week()
+    cancelled_lookup = cancellation_index.lookup(week["week_dates"])
+
     template = "admin_faculty_timetable.html" if session.get("role") == "admin" else "teacher_timetable.html"
     return render_template(
         "teacher_timetable.html",   
         entries=entries,
         cancelled_lookup=cancelled_lookup,
-        teacher_name=teacher.name   
+        room_overrides=room_overrides(week["week_dates"]),
+        teacher_name=teacher.name,
+        **week
     )
 
 
@@ -383,51 +443,14 @@ def faculty_timetable(teacher_id):
 def view_floating_timetable():
 
     role = session.get("role")
-    
-    entries = TimetableEntry.query.order_by(
-        TimetableEntry.class_id,
-        TimetableEntry.day,
-        TimetableEntry.slot
-    ).all()
 
-    raw = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    week = requested_week()
 
-    for e in entries:
+    grid = get_floating_grid(week["week"], week["week_dates"])
 
-        cls = e.class_obj.name
-        day = e.day
-        slot = normalize_slot(e.slot)
-
-        cell = raw[cls][day][slot]
-
-        # check if subject already exists in this slot
-        existing = None
-        for item in cell:
-            if (
-                item["subject"] == (e.subject.name if e.subject else "-")
-                and item["batch"] == e.batch
-                and item["lab_rooms"] == e.lab_rooms
-            ):
-                existing = item
-                break
-
-        teacher_name = e.teacher.name if e.teacher else ""
-
-        if existing:
-            # append teacher
-            if teacher_name and teacher_name not in existing["teachers"]:
-                existing["teachers"].append(teacher_name)
-        else:
-            cell.append({
-                "subject": e.subject.name if e.subject else "-",
-                "room": e.room.name if e.room else "-",
-                "lab_rooms": e.lab_rooms,
-                "batch": e.batch,
-                "teachers": [teacher_name] if teacher_name else []
-            })
-
-    cancelled_lookup = get_cancelled_lookup(include_class_name=True)
-    class_map = {c.name: c.id for c in Class.query.all()}
+    cancelled_lookup = cancellation_index.lookup_by_class_name(
+        week["week_dates"]
+    )
 
     if role == "admin":
         template = "floating_timetable_grid.html"
@@ -436,11 +459,12 @@ def view_floating_timetable():
 
     return render_template(
         template,
-        timetable=raw,
+        timetable=grid["timetable"],
         slots=TIME_SLOTS,
         days=DAYS,
         cancelled_lookup=cancelled_lookup,
-        class_map=class_map
+        class_map=grid["class_map"],
+        **week
     )
 
 @app.route("/teacher")
@@ -453,23 +477,22 @@ def teacher_dashboard():
     if not user.teacher_id:
         return "Teacher account not linked to faculty record"
 
-    entries = (
-        TimetableEntry.query
-        .filter(TimetableEntry.teacher_id == user.teacher_id)
-        .order_by(TimetableEntry.day, TimetableEntry.slot)
-        .all()
-    )
+    entries = teacher_entries(user.teacher_id)
 
     for e in entries:
         print(e.subject.name if e.subject else None,
               e.class_obj.name if e.class_obj else None)
 
-    cancelled_lookup = get_cancelled_lookup()
+    week = requested_week()
+
+    cancelled_lookup = cancellation_index.lookup(week["week_dates"])
 
     return render_template(
         "teacher_timetable.html",
         entries=entries,
-        cancelled_lookup=cancelled_lookup
+        cancelled_lookup=cancelled_lookup,
+        room_overrides=room_overrides(week["week_dates"]),
+        **week
     )
 
 @app.route("/student")
@@ -479,23 +502,26 @@ def student_dashboard():
 
     user = User.query.get(session["user_id"])
 
-    cls = Class.query.get(user.class_id)
+    cls = Class.query.get(user.class_id) if user.class_id else None
 
-    entries = TimetableEntry.query.filter_by(
-        class_id=user.class_id
-    ).all()
+    if not cls:
+        return "Student account not linked to a class"
+
+    entries = class_entries(user.class_id, ordered=False)
 
-    cancelled_lookup = {
-    (c_day, slot)
-    for (cid, c_day, slot) in get_cancelled_lookup()
-    if cid == user.class_id
-}
+    week = requested_week()
+
+    cancelled_lookup = cancellation_index.class_slots(
+        user.class_id, week["week_dates"]
+    )
 
     return render_template(
         "student_timetable.html",
         entries=entries,
         class_name=cls.name,
-        cancelled_lookup=cancelled_lookup
+        cancelled_lookup=cancelled_lookup,
+        room_overrides=room_overrides(week["week_dates"]),
+        **week
     )
 
 @app.route("/logout")
@@ -508,9 +534,7 @@ def logout():
 @login_required
 def class_timetable(class_id):
 
-    entries = TimetableEntry.query.filter_by(class_id=class_id)\
-        .order_by(TimetableEntry.day, TimetableEntry.slot)\
-        .all()
+    entries = class_entries(class_id)
 
     return render_template(
         "class_timetable.html",
@@ -523,95 +547,80 @@ def export_class_timetable(class_id):
 
     cls = Class.query.get_or_404(class_id)
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = cls.name
-
-    center = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    bold = Font(bold=True)
-
-    ws.merge_cells("A1:G1")
-    ws["A1"] = "AISAT/Form/QPM18/F3"
-    ws["A1"].alignment = center
-    ws["A1"].font = bold
-
-    ws.merge_cells("A2:G2")
-    ws["A2"] = "Regular Class Timetable"
-    ws["A2"].alignment = center
-    ws["A2"].font = bold
-
-    ws.merge_cells("A3:G3")
-    ws["A3"] = f"Class: {cls.name}"
-    ws["A3"].alignment = center
-
-    ws.append([])
+    owner = [(cls.id, cls.name)]
 
-    headers = [
-        "Day",
-        "8.00 - 8.45",
-        "9.10 - 9.55",
-        "10.00 - 10.45",
-        "10.50 - 11.35",
-        "11.55 - 12.40",
-        "12.45 - 1.30"
-    ]
-
-    ws.append(headers)
-
-    entries = TimetableEntry.query.filter_by(class_id=class_id).all()
-
-    data = {}
+    return send_export(
+        f"class-{cls.id}",
+        f"{cls.name}_timetable.xlsx",
+        lambda target: export_timetables("class", owner, target)
+    )
 
-    for e in entries:
-        data.setdefault(e.day, {})
-        data[e.day].setdefault(e.slot, [])
 
-        subject = e.subject.name if e.subject else "-"
-        teacher = f"[{e.teacher.name}]" if e.teacher else ""
+@app.route("/export_timetables")
+@login_required
+@role_required("admin")
+def export_all_timetables():
 
-        if e.lab_rooms:
-            room = f"({e.lab_rooms})"
-        elif e.room:
-            room = f"({e.room.name})"
-        else:
-            room = ""
+    by = request.args.get("by", "class")
+    fmt = request.args.get("format", "xlsx")
 
-        text = f"{subject}\n{teacher}\n{room}"
+    if by not in ("class", "teacher") or fmt not in ("xlsx", "zip"):
+        abort(400)
 
-        data[e.day][e.slot].append(text)
+    name = "class" if by == "class" else "faculty"
 
-    for day in DAYS:
+    return send_export(
+        f"all-{by}",
+        f"{name}_timetables.{fmt}",
+        lambda target: export_timetables(by, owners(by), target, fmt)
+    )
 
-        row = [day]
 
-        for slot in TIME_SLOTS:
+def send_export(key, download_name, build):
+    """
+    Sends the export artifact for key, built by build(target) only when
+    the timetable changed since it was last built. The ETag carries the
+    timetable version, so a client holding the current file gets a 304
+    without anything being built or read.
+    """
 
-            cell = data.get(day, {}).get(slot, [])
+    extension = download_name.rsplit(".", 1)[1]
 
-            if cell:
-                row.append("\n".join(cell))
-            else:
-                row.append("")
+    # one key can be sent as xlsx or zip; the bodies need their own tags
+    key = f"{key}-{extension}"
 
-        ws.append(row)
+    version = timetable_version()
+    etag = export_etag(key, version)
 
-    for row in ws.iter_rows():
-        for cell in row:
-            cell.alignment = center
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
 
-    file_stream = io.BytesIO()
-    wb.save(file_stream)
-    file_stream.seek(0)
+    path = cached_export(key, version, extension, build)
 
     return send_file(
-        file_stream,
+        path,
         as_attachment=True,
-        download_name=f"{cls.name}_timetable.xlsx",
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        download_name=download_name,
+        mimetype=XLSX_MIMETYPE if extension == "xlsx" else "application/zip",
+        etag=etag
     )
 if __name__ == "__main__":
 
     with app.app_context():
         db.create_all()
 
+        if 3 in run_migrations():
+            # floating rooms were allocated around cancellations before
+            allocate_rooms()
+
+        fail_stale_jobs()
+
+        # dates may have moved into the horizon while the server was down
+        allocate_dates()
+
+    # and from now on they move in each midnight
+    schedule_daily(app, "horizon", run_horizon_job)
+
     app.run(debug=True, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""
+Times load_snapshot() and plan_rooms() on the sample upload with the lab
+room bookings in the snapshot and without them, as before they were
+read, and counts the floating classes each plan puts in a room a lab
+session holds.
+
+    python bench/allocator_bench.py [uploads folder] [runs]
+"""
+
+import io
+import os
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# a throwaway in-memory database, set before app.py reads it
+os.environ["DATABASE_URL"] = "sqlite://"
+
+from app import app
+from allocator import Snapshot, load_snapshot, plan_rooms, slot_key
+from input_processor import process_inputs, provision_users
+from migrations import run_migrations
+from models import db, LabRoomBooking
+from workbook_loader import load_workbooks
+
+
+def without_labs(snapshot):
+
+    return Snapshot(
+        rooms=snapshot.rooms,
+        strengths=snapshot.strengths,
+        entries=snapshot.entries,
+        class_names=snapshot.class_names,
+        room_names=snapshot.room_names
+    )
+
+
+def lab_clashes(snapshot, rooms):
+    """Floating entries planned into a room a lab session holds."""
+
+    held = {(*slot_key(lab), lab.room_id) for lab in snapshot.labs}
+
+    return sum(
+        1
+        for e in snapshot.entries
+        if e.is_floating and (*slot_key(e), rooms.get(e.id)) in held
+    )
+
+
+def median_ms(samples):
+
+    return statistics.median(samples) * 1e3
+
+
+def main():
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "uploads")
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    with app.app_context():
+
+        # the import logs every row; only the results are wanted
+        with redirect_stdout(io.StringIO()):
+
+            db.create_all()
+            run_migrations()
+
+            provision_users(process_inputs(
+                load_workbooks(folder, workers=1, cache=False),
+                differential=True
+            ))
+
+        snapshot = load_snapshot()
+        bare = without_labs(snapshot)
+
+        timings = {"load": [], "bookings query": [], "plan": [], "plan, no labs": []}
+
+        # interleaved, so drift in machine load hits every variant alike
+        for _ in range(runs):
+
+            start = time.perf_counter()
+            load_snapshot()
+            timings["load"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            db.session.query(LabRoomBooking.entry_id, LabRoomBooking.room_id).all()
+            timings["bookings query"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            plan_rooms(snapshot, workers=1)
+            timings["plan"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            plan_rooms(bare, workers=1)
+            timings["plan, no labs"].append(time.perf_counter() - start)
+
+        print(
+            f"{len(snapshot.entries)} entries, {len(snapshot.labs)} lab rooms held, "
+            f"median of {runs} runs:"
+        )
+
+        for name, samples in timings.items():
+            print(f"  {name:<16} {median_ms(samples):8.3f} ms")
+
+        # before the bookings were read, the load skipped their query
+        load = median_ms(timings["load"])
+        before = load - median_ms(timings["bookings query"]) + median_ms(timings["plan, no labs"])
+        after = load + median_ms(timings["plan"])
+
+        print(f"  load + plan      {before:8.3f} ms before, {after:.3f} ms after")
+
+        print(
+            "floating classes in a lab's room: "
+            f"{lab_clashes(snapshot, plan_rooms(bare, workers=1))} without labs, "
+            f"{lab_clashes(snapshot, plan_rooms(snapshot, workers=1))} with labs"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Times utils.normalize against the per-call re.sub() versions it
+replaced, on the slot headers and subject cells of the sample upload,
+and checks both give the same output for every value.
+
+    python bench/normalize_bench.py [uploads folder]
+"""
+
+import os
+import re
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.normalize import (
+    normalize_slot, normalize_subject, normalize_slots, normalize_subjects
+)
+from workbook_loader import load_workbooks
+
+
+def old_normalize_slot(slot):
+
+    if slot is None:
+        return None
+
+    s = str(slot).strip()
+    s = s.replace(":", ".")
+    s = re.sub(r"\s+", "", s)
+    s = re.sub(r"[-–—]+", "_-_", s)
+    s = re.sub(r"_+", "_", s)
+    s = s.strip("_")
+
+    return s
+
+
+def old_normalize_subject(subject):
+
+    if subject is None:
+        return None
+
+    s = str(subject).strip()
+    s = re.sub(r"\s+", " ", s)
+    return s.upper()
+
+
+EDGE_CASES = [
+    None, "", "  ", 1, 1.0, 10.5, "10:50-11:35", "10.50 _ - _ 11.35",
+    "10.50–11.35", "10.50——11.35", "__8.00__-__8.45__", "cp / phy\tlab\n"
+]
+
+
+def sample_values(folder):
+
+    frames = load_workbooks(folder, workers=1, cache=False)
+
+    slots, subjects = [], []
+
+    for sheet in frames["timetables"].values():
+        slot_columns = list(sheet.columns[1:])
+        slots.extend(slot_columns)
+        subjects.extend(sheet[slot_columns].stack().tolist())
+
+    subjects.extend(frames["teacher_subject"]["subject"].tolist())
+
+    return slots + EDGE_CASES, subjects + EDGE_CASES
+
+
+def check(name, old, new, values):
+
+    mismatches = [(v, old(v), new(v)) for v in values if old(v) != new(v)]
+
+    for value, expected, got in mismatches[:10]:
+        print(f"  {name}({value!r}): {expected!r} != {got!r}")
+
+    if mismatches:
+        sys.exit(f"{name}: {len(mismatches)} of {len(values)} values differ")
+
+    print(f"{name}: {len(values)} values, outputs match")
+
+
+def bench(name, stmt, number):
+
+    seconds = min(timeit.repeat(stmt, number=number, repeat=5)) / number
+    print(f"  {name:<28} {seconds * 1e3:9.3f} ms")
+
+    return seconds
+
+
+def main():
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "uploads")
+    slots, subjects = sample_values(folder)
+
+    check("normalize_slot", old_normalize_slot, normalize_slot, slots)
+    check("normalize_subject", old_normalize_subject, normalize_subject, subjects)
+
+    # the import normalizes each timetable cell, so time passes over all
+    # of them rather than single calls
+    for name, values, old, new, batch in [
+        ("slots", slots, old_normalize_slot, normalize_slot, normalize_slots),
+        ("subjects", subjects, old_normalize_subject, normalize_subject, normalize_subjects),
+    ]:
+
+        print(f"{name} ({len(values)} values, per pass):")
+
+        before = bench("re.sub per call", lambda: [old(v) for v in values], 200)
+        after = bench("memoized", lambda: [new(v) for v in values], 200)
+        batched = bench("batch", lambda: batch(values), 200)
+
+        print(f"  speedup {before / after:.1f}x memoized, {before / batched:.1f}x batch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Counts the SQL statements each timetable view issues on the sample
+upload, with relationships loaded eagerly by queries.timetable_entries()
+and, for comparison, lazily as before (one SELECT per related row).
+
+    python bench/query_counts.py [uploads folder]
+
+Each view is requested twice and the second request is counted, so
+process-level caches filled by the first one do not skew the numbers.
+"""
+
+import io
+import os
+import sys
+from contextlib import contextmanager, redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# a throwaway in-memory database, set before app.py reads it
+os.environ["DATABASE_URL"] = "sqlite://"
+
+from sqlalchemy import event
+
+import app as app_module
+import queries
+from allocator import allocate_rooms
+from input_processor import process_inputs, provision_users
+from migrations import run_migrations
+from models import db, User, Teacher, TimetableEntry
+from workbook_loader import load_workbooks
+
+
+def lazy_entries(*criteria):
+
+    return TimetableEntry.query.filter(*criteria)
+
+
+@contextmanager
+def loading(entries):
+
+    saved = queries.timetable_entries, app_module.timetable_entries
+    queries.timetable_entries = app_module.timetable_entries = entries
+
+    try:
+        yield
+    finally:
+        queries.timetable_entries, app_module.timetable_entries = saved
+
+
+@contextmanager
+def counting():
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+
+
+def client_for(app, user_id, role):
+
+    client = app.test_client()
+
+    with client.session_transaction() as s:
+        s["user_id"] = user_id
+        s["role"] = role
+
+    return client
+
+
+def main():
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "uploads")
+    app = app_module.app
+
+    # the import and the views log as they go; only the table is wanted
+    with app.app_context(), redirect_stdout(io.StringIO()):
+
+        db.create_all()
+        run_migrations()
+
+        plan = process_inputs(
+            load_workbooks(folder, workers=1, cache=False), differential=True
+        )
+        provision_users(plan)
+        allocate_rooms()
+
+        teacher = User.query.filter(User.teacher_id.isnot(None)).first()
+        student = User.query.filter(User.class_id.isnot(None)).first()
+        faculty = db.session.get(Teacher, teacher.teacher_id)
+
+        views = [
+            ("/teacher", client_for(app, teacher.id, "teacher")),
+            ("/student", client_for(app, student.id, "student")),
+            (f"/admin/faculty/{faculty.id}", client_for(app, 0, "admin")),
+        ]
+
+        rows = []
+
+        for path, client in views:
+
+            counts = []
+
+            for entries in (lazy_entries, queries.timetable_entries):
+
+                with loading(entries):
+
+                    client.get(path)
+
+                    with counting() as statements:
+                        response = client.get(path)
+
+                assert response.status_code == 200, (path, response.status_code)
+                counts.append(len(statements))
+
+            rows.append((path, *counts))
+
+    print(f"{'view':<28} {'lazy':>6} {'eager':>6}")
+
+    for path, lazy, eager in rows:
+        print(f"{path:<28} {lazy:>6} {eager:>6}")
+
+
+if __name__ == "__main__":
+    main()
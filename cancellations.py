@@ -0,0 +1,210 @@
+import threading
+from datetime import date
+
+from models import db, Class, CancelledClass
+from timeslots import slot_table
+
+
+class CancellationIndex:
+    """
+    In-memory index of upcoming cancellations (date >= today), grouped
+    per date and keyed by (class_id, day, slot) with day and slot as
+    codes from the slot table. Every lookup is a dict/set operation; the
+    label views the templates use are derived from the codes on demand,
+    either for every upcoming date or only for the dates a view shows.
+
+    The index loads itself from the database on first use and again when
+    the date changes, and is kept current in place by add() and remove().
+    Returned collections are shared and must be treated as read-only.
+    """
+
+    def __init__(self):
+
+        self._lock = threading.RLock()
+        self._loaded_on = None
+        self._generation = 0
+
+    def invalidate(self):
+
+        with self._lock:
+            self._generation += 1
+            self._loaded_on = None
+
+    def _ensure_loaded(self):
+
+        today = date.today()
+
+        if self._loaded_on == today:
+            return
+
+        with self._lock:
+
+            if self._loaded_on == today:
+                return
+
+            generation = self._generation
+
+            self._rows = {}
+            self._by_date = {}
+            self._by_label = None
+            self._by_name = None
+
+            self._class_names = dict(db.session.query(Class.id, Class.name))
+
+            for c in CancelledClass.query.filter(CancelledClass.date >= today):
+                self._add(c.id, c.class_id, c.date, c.slot)
+
+            if generation == self._generation:
+                self._loaded_on = today
+
+    def _add(self, cancelled_id, class_id, cancel_date, slot):
+
+        key = (
+            class_id,
+            slot_table.weekday_code(cancel_date),
+            slot_table.slot_code(slot)
+        )
+
+        self._rows[cancelled_id] = (cancel_date, key)
+        self._by_date.setdefault(cancel_date, {}).setdefault(key, set()).add(
+            cancelled_id
+        )
+        self._by_label = None
+        self._by_name = None
+
+    def add(self, cancelled):
+
+        self._ensure_loaded()
+
+        if cancelled.date < self._loaded_on:
+            return
+
+        with self._lock:
+
+            if cancelled.class_id not in self._class_names:
+                cls = db.session.get(Class, cancelled.class_id)
+                if cls:
+                    self._class_names[cls.id] = cls.name
+
+            self._add(
+                cancelled.id, cancelled.class_id,
+                cancelled.date, cancelled.slot
+            )
+
+    def remove(self, cancelled):
+
+        self._ensure_loaded()
+
+        with self._lock:
+
+            row = self._rows.pop(cancelled.id, None)
+
+            if row is None:
+                return
+
+            cancel_date, key = row
+
+            keys = self._by_date[cancel_date]
+            ids = keys[key]
+            ids.discard(cancelled.id)
+
+            if ids:
+                return
+
+            del keys[key]
+
+            if not keys:
+                del self._by_date[cancel_date]
+
+            self._by_label = None
+            self._by_name = None
+
+    def _keys(self, dates):
+
+        if dates is None:
+            return {key for keys in self._by_date.values() for key in keys}
+
+        return {
+            key
+            for d in dates
+            for key in self._by_date.get(d, ())
+        }
+
+    def dates(self):
+        """Dates that have at least one upcoming cancellation, in order."""
+
+        self._ensure_loaded()
+
+        return sorted(self._by_date)
+
+    def on_date(self, d):
+        """Cancellations of one date as (class_id, day_code, slot_code) keys."""
+
+        self._ensure_loaded()
+
+        return self._by_date.get(d, {}).keys()
+
+    def lookup(self, dates=None):
+        """
+        Cancellations on dates (default: every upcoming date) as a set of
+        (class_id, day, slot) labels.
+        """
+
+        self._ensure_loaded()
+
+        with self._lock:
+
+            if dates is not None:
+                return self._labels(self._keys(dates))
+
+            if self._by_label is None:
+                self._by_label = self._labels(self._keys(None))
+
+            return self._by_label
+
+    def _labels(self, keys):
+
+        return {
+            (class_id, slot_table.day_label(day), slot_table.slot_label(slot))
+            for class_id, day, slot in keys
+        }
+
+    def lookup_by_class_name(self, dates=None):
+        """
+        Cancellations on dates (default: every upcoming date) as a set of
+        (class name, day, slot).
+        """
+
+        self._ensure_loaded()
+
+        with self._lock:
+
+            if dates is None and self._by_name is not None:
+                return self._by_name
+
+            by_name = {
+                (self._class_names[class_id], day, slot)
+                for class_id, day, slot in self.lookup(dates)
+                if class_id in self._class_names
+            }
+
+            if dates is None:
+                self._by_name = by_name
+
+            return by_name
+
+    def class_slots(self, class_id, dates=None):
+        """Cancelled (day, slot) label pairs of one class on dates."""
+
+        self._ensure_loaded()
+
+        with self._lock:
+
+            return {
+                (slot_table.day_label(day), slot_table.slot_label(slot))
+                for cancelled_class, day, slot in self._keys(dates)
+                if cancelled_class == class_id
+            }
+
+
+cancellation_index = CancellationIndex()
@@ -0,0 +1,132 @@
+from collections import Counter
+
+from models import db, Class, Room, Teacher, TimetableEntry, LabRoomBooking
+from timeslots import slot_table
+
+
+def _cell(day, slot):
+    return {"day": slot_table.day_label(day), "slot": slot_table.slot_label(slot)}
+
+
+def find_conflicts():
+    """
+    Checks the whole timetable for clashes in one pass over the entries,
+    with dict indexes keyed by (owner, day code, slot code):
+
+    - teacher: a teacher booked with more than one class or batch;
+    - room: a room used by more than one class, lab sessions included;
+    - batch: a parallel batch listed twice for the same class, or held
+      while the class has a lab session in the same slot.
+
+    Returns {"teacher": [...], "room": [...], "batch": [...], "count": n}
+    with names and labels, ready to be stored as a job result.
+    """
+
+    rows = db.session.query(
+        TimetableEntry.class_id,
+        TimetableEntry.teacher_id,
+        TimetableEntry.room_id,
+        TimetableEntry.day_code,
+        TimetableEntry.slot_code,
+        TimetableEntry.batch,
+        TimetableEntry.is_lab_hour
+    )
+
+    # (teacher_id, day, slot) -> {(class_id, batch)}
+    by_teacher = {}
+
+    # (room_id, day, slot) -> {class_id}
+    by_room = {}
+
+    # (class_id, day, slot) -> [batches, has a lab]
+    by_class = {}
+
+    for class_id, teacher_id, room_id, day, slot, batch, is_lab in rows:
+
+        if teacher_id is not None:
+            by_teacher.setdefault((teacher_id, day, slot), set()).add(
+                (class_id, batch)
+            )
+
+        if room_id is not None:
+            by_room.setdefault((room_id, day, slot), set()).add(class_id)
+
+        if batch is not None or is_lab:
+
+            cell = by_class.setdefault((class_id, day, slot), [[], False])
+
+            if batch is not None:
+                cell[0].append(batch)
+
+            if is_lab:
+                cell[1] = True
+
+    labs = (
+        db.session.query(
+            TimetableEntry.class_id,
+            TimetableEntry.day_code,
+            TimetableEntry.slot_code,
+            LabRoomBooking.room_id
+        )
+        .join(LabRoomBooking, LabRoomBooking.entry_id == TimetableEntry.id)
+    )
+
+    for class_id, day, slot, room_id in labs:
+        by_room.setdefault((room_id, day, slot), set()).add(class_id)
+
+    class_names = dict(db.session.query(Class.id, Class.name))
+    teacher_names = dict(db.session.query(Teacher.id, Teacher.name))
+    room_names = dict(db.session.query(Room.id, Room.name))
+
+    def group_name(class_id, batch):
+        name = class_names.get(class_id)
+        return f"{name} ({batch})" if batch else name
+
+    report = {"teacher": [], "room": [], "batch": []}
+
+    for (teacher_id, day, slot), groups in by_teacher.items():
+
+        if len(groups) > 1:
+            report["teacher"].append({
+                "teacher": teacher_names.get(teacher_id),
+                **_cell(day, slot),
+                "classes": sorted(group_name(*group) for group in groups)
+            })
+
+    for (room_id, day, slot), class_ids in by_room.items():
+
+        if len(class_ids) > 1:
+            report["room"].append({
+                "room": room_names.get(room_id),
+                **_cell(day, slot),
+                "classes": sorted(class_names.get(c) for c in class_ids)
+            })
+
+    for (class_id, day, slot), (batches, has_lab) in by_class.items():
+
+        repeated = sorted(b for b, n in Counter(batches).items() if n > 1)
+
+        if repeated:
+            report["batch"].append({
+                "class": class_names.get(class_id),
+                **_cell(day, slot),
+                "batches": repeated,
+                "problem": "batch listed more than once"
+            })
+
+        if batches and has_lab:
+            report["batch"].append({
+                "class": class_names.get(class_id),
+                **_cell(day, slot),
+                "batches": sorted(set(batches)),
+                "problem": "batch overlaps a lab session"
+            })
+
+    for conflicts in report.values():
+        conflicts.sort(key=lambda c: (
+            slot_table.day_code(c["day"]), slot_table.slot_code(c["slot"])
+        ))
+
+    report["count"] = sum(len(conflicts) for conflicts in report.values())
+
+    return report
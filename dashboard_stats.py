@@ -0,0 +1,163 @@
+import threading
+
+from sqlalchemy import func
+
+from models import db, Class, Room, TimetableEntry
+from timeslots import DAYS, TIME_SLOTS, slot_table
+
+
+# slots with the highest demand for free rooms shown on the dashboard
+PEAK_SLOTS = 5
+
+_lock = threading.Lock()
+_stats = None
+
+
+def compute_stats():
+    """
+    Everything the admin dashboard shows, from two grouped queries and
+    one pass over the entries:
+
+    - class counts per category;
+    - allocated_count, the floating-class (class, day, slot) cells where
+      every entry has a room, out of floating_cell_count;
+    - unallocated_by_day, the floating cells still missing a room;
+    - room_utilization, the share of the weekly slots each room is used;
+    - peak_slots, the slots where floating entries need the largest
+      share of the rooms left free by everyone else.
+    """
+
+    categories = dict(
+        db.session.query(Class.class_category, func.count(Class.id))
+        .group_by(Class.class_category)
+    )
+
+    rooms = db.session.query(Room.id, Room.name, Room.capacity).all()
+
+    rows = (
+        db.session.query(
+            TimetableEntry.class_id,
+            TimetableEntry.day_code,
+            TimetableEntry.slot_code,
+            TimetableEntry.room_id,
+            TimetableEntry.is_floating,
+            TimetableEntry.is_lab_hour,
+            Class.class_category
+        )
+        .join(Class, TimetableEntry.class_id == Class.id)
+    )
+
+    # (class_id, day, slot) of floating classes -> [entries, with a room]
+    cells = {}
+
+    room_slots = {}
+    demand = {}
+    fixed = {}
+
+    for class_id, day, slot, room_id, is_floating, is_lab, category in rows:
+
+        key = (day, slot)
+
+        if category == "floating":
+
+            cell = cells.setdefault((class_id, day, slot), [0, 0])
+            cell[0] += 1
+
+            if room_id is not None:
+                cell[1] += 1
+
+        if room_id is not None:
+
+            room_slots.setdefault(room_id, set()).add(key)
+
+            if not is_floating:
+                fixed.setdefault(key, set()).add(room_id)
+
+        if is_floating and not is_lab:
+            demand[key] = demand.get(key, 0) + 1
+
+    unallocated = {}
+
+    for (_, day, _), (total, allocated) in cells.items():
+        if allocated < total:
+            unallocated[day] = unallocated.get(day, 0) + 1
+
+    week = len(DAYS) * len(TIME_SLOTS)
+
+    room_utilization = sorted(
+        (
+            {
+                "name": name,
+                "capacity": capacity,
+                "used": len(room_slots.get(room_id, ())),
+                "percent": round(100 * len(room_slots.get(room_id, ())) / week)
+            }
+            for room_id, name, capacity in rooms
+        ),
+        key=lambda r: (-r["used"], r["name"])
+    )
+
+    peak_slots = []
+
+    for (day, slot), needed in demand.items():
+
+        free = len(rooms) - len(fixed.get((day, slot), ()))
+
+        peak_slots.append({
+            "day": slot_table.day_label(day),
+            "slot": slot_table.slot_label(slot),
+            "demand": needed,
+            "free": free,
+            "pressure": round(100 * needed / free) if free else None
+        })
+
+    peak_slots.sort(
+        key=lambda s: (
+            s["pressure"] is not None,
+            -(s["pressure"] or 0),
+            -s["demand"]
+        )
+    )
+
+    return {
+        "permanent_count": categories.get("permanent", 0),
+        "floating_count": categories.get("floating", 0),
+        "allocated_count": sum(
+            1 for total, allocated in cells.values() if allocated == total
+        ),
+        "floating_cell_count": len(cells),
+        "unallocated_by_day": [
+            (slot_table.day_label(day), count)
+            for day, count in sorted(unallocated.items())
+        ],
+        "room_utilization": room_utilization,
+        "peak_slots": peak_slots[:PEAK_SLOTS]
+    }
+
+
+def refresh_dashboard_stats():
+    """
+    Recomputes the dashboard statistics. Called after every commit that
+    changes classes, entries or rooms, so reading them stays free.
+    """
+
+    global _stats
+
+    with _lock:
+        _stats = compute_stats()
+
+    return _stats
+
+
+def get_dashboard_stats():
+    """
+    Returns the current statistics, computing them once if nothing has
+    yet (e.g. after a restart). Callers must treat them as read-only.
+    """
+
+    stats = _stats
+
+    if stats is not None:
+        return stats
+
+    return refresh_dashboard_stats()
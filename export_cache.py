@@ -0,0 +1,128 @@
+import os
+import secrets
+import threading
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, TimetableVersion
+
+
+CACHE_DIR = os.path.join("uploads", ".cache", "exports")
+
+# bump when the exported files change so old artifacts are not served
+EXPORT_FORMAT = 1
+
+_lock = threading.Lock()
+
+# the version whose artifacts were last kept, so eviction scans once
+# per version
+_kept_version = None
+
+
+def new_token():
+
+    return secrets.token_hex(8)
+
+
+def timetable_version():
+    """
+    The timetable version as "<version>.<token>". The token tells apart
+    databases whose counters happen to be equal, so an artifact built
+    against one is never served for another. "0" before anything was
+    imported.
+    """
+
+    row = (
+        db.session.query(TimetableVersion.version, TimetableVersion.token)
+        .filter_by(id=1)
+        .first()
+    )
+
+    if row is None:
+        return "0"
+
+    return f"{row.version}.{row.token}"
+
+
+def bump_timetable_version():
+    """
+    Adds a version bump to the current transaction. Call it before the
+    commit that changes timetable entries or their rooms.
+    """
+
+    db.session.execute(
+        sqlite_insert(TimetableVersion)
+        .values(id=1, version=1, token=new_token())
+        .on_conflict_do_update(
+            index_elements=["id"],
+            set_={"version": TimetableVersion.version + 1}
+        )
+    )
+
+
+def export_etag(key, version):
+
+    return f"{key}-v{version}-f{EXPORT_FORMAT}"
+
+
+def _version_of(name):
+
+    try:
+        return name.rsplit("-v", 1)[1].split("-", 1)[0]
+    except IndexError:
+        return None
+
+
+def _evict(cache_dir, version):
+    """Deletes artifacts of every version but version."""
+
+    global _kept_version
+
+    if version == _kept_version:
+        return
+
+    for name in os.listdir(cache_dir):
+
+        # another process may be writing it
+        if name.endswith(".tmp"):
+            continue
+
+        old = _version_of(name)
+
+        if old is not None and old != version:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+    _kept_version = version
+
+
+def cached_export(key, version, extension, build, cache_dir=CACHE_DIR):
+    """
+    Path of the export artifact for key at a timetable version.
+
+    build(target) writes the artifact to a file object; it only runs
+    when the artifact is not on disk yet. Artifacts of other versions
+    are removed the first time a new version is asked for.
+    """
+
+    os.makedirs(cache_dir, exist_ok=True)
+
+    path = os.path.join(cache_dir, f"{export_etag(key, version)}.{extension}")
+
+    with _lock:
+
+        _evict(cache_dir, version)
+
+        if os.path.exists(path):
+            return os.path.abspath(path)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, "wb") as f:
+            build(f)
+
+        os.replace(tmp_path, path)
+
+    return os.path.abspath(path)
@@ -0,0 +1,214 @@
+import zipfile
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font
+
+from models import db, Class, Subject, Teacher, Room, TimetableEntry
+from timeslots import TIME_SLOTS, DAYS, slot_table
+
+
+XLSX_MIMETYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+)
+
+FORM_CODE = "AISAT/Form/QPM18/F3"
+
+HEADERS = ["Day"] + [slot.replace("_-_", " - ") for slot in TIME_SLOTS]
+
+# built once and shared by every cell written
+CENTER = Alignment(horizontal="center", vertical="center", wrap_text=True)
+BOLD = Font(bold=True)
+
+# characters Excel does not allow in sheet names
+_BAD_TITLE_CHARS = str.maketrans({c: "_" for c in "[]:*?/\\"})
+
+
+def _owner_cells(by, owner_ids=None):
+    """
+    Cell texts of the timetables of every class (by="class") or teacher
+    (by="teacher") from one joined query, as
+    {owner id: {(day code, slot code): [text, ...]}}.
+    """
+
+    owner = TimetableEntry.class_id if by == "class" else TimetableEntry.teacher_id
+
+    rows = (
+        db.session.query(
+            owner,
+            TimetableEntry.day_code,
+            TimetableEntry.slot_code,
+            Subject.name,
+            Teacher.name,
+            Class.name,
+            Room.name,
+            TimetableEntry.lab_rooms
+        )
+        .join(Class, TimetableEntry.class_id == Class.id)
+        .outerjoin(Subject, TimetableEntry.subject_id == Subject.id)
+        .outerjoin(Teacher, TimetableEntry.teacher_id == Teacher.id)
+        .outerjoin(Room, TimetableEntry.room_id == Room.id)
+        .filter(owner.isnot(None))
+        .order_by(TimetableEntry.id)
+    )
+
+    if owner_ids is not None:
+        rows = rows.filter(owner.in_(owner_ids))
+
+    cells = {}
+
+    for owner_id, day, slot, subject, teacher, class_name, room, lab_rooms in rows:
+
+        # a class sheet names the teacher, a teacher sheet the class
+        who = teacher if by == "class" else class_name
+        who = f"[{who}]" if who else ""
+
+        if lab_rooms:
+            where = f"({lab_rooms})"
+        elif room:
+            where = f"({room})"
+        else:
+            where = ""
+
+        (
+            cells
+            .setdefault(owner_id, {})
+            .setdefault((day, slot), [])
+            .append(f"{subject or '-'}\n{who}\n{where}")
+        )
+
+    return cells
+
+
+def _cell(ws, value, font=None):
+
+    cell = WriteOnlyCell(ws, value)
+    cell.alignment = CENTER
+
+    if font is not None:
+        cell.font = font
+
+    return cell
+
+
+def _sheet_title(name, used):
+    """A valid sheet title for name, unique (ignoring case) among used."""
+
+    base = str(name).translate(_BAD_TITLE_CHARS)[:31] or "Sheet"
+    title = base
+    n = 1
+
+    while title.lower() in used:
+        n += 1
+        suffix = f" ({n})"
+        title = base[:31 - len(suffix)] + suffix
+
+    used.add(title.lower())
+
+    return title
+
+
+def _write_sheet(wb, title, heading, cells):
+
+    ws = wb.create_sheet(title)
+
+    for row in (1, 2, 3):
+        ws.merged_cells.add(f"A{row}:G{row}")
+
+    ws.append([_cell(ws, FORM_CODE, BOLD)])
+    ws.append([_cell(ws, "Regular Class Timetable", BOLD)])
+    ws.append([_cell(ws, heading)])
+    ws.append([])
+    ws.append([_cell(ws, header) for header in HEADERS])
+
+    slot_codes = [slot_table.slot_code(slot) for slot in TIME_SLOTS]
+
+    for day in DAYS:
+
+        day_code = slot_table.day_code(day)
+
+        ws.append(
+            [_cell(ws, day)] + [
+                _cell(ws, "\n".join(cells.get((day_code, slot_code), [])))
+                for slot_code in slot_codes
+            ]
+        )
+
+
+def _sheets(by, owners):
+    """
+    (title, heading, cells) for each (id, name) in owners, in order.
+    """
+
+    cells = _owner_cells(by, [owner_id for owner_id, _ in owners])
+    label = "Class" if by == "class" else "Faculty"
+
+    for owner_id, name in owners:
+        yield name, f"{label}: {name}", cells.get(owner_id, {})
+
+
+def write_workbook(sheets, target):
+    """
+    Writes (name, heading, cells) sheets into one workbook in openpyxl
+    write-only mode, so rows go straight to disk instead of being held
+    as cell objects.
+    """
+
+    wb = Workbook(write_only=True)
+    used = set()
+
+    for name, heading, cells in sheets:
+        _write_sheet(wb, _sheet_title(name, used), heading, cells)
+
+    if not used:
+        wb.create_sheet("Timetable")
+
+    wb.save(target)
+
+
+def write_zip(sheets, target):
+    """
+    Writes each (name, heading, cells) sheet as its own workbook inside
+    one zip archive.
+    """
+
+    used = set()
+
+    # the workbooks are zip files already, storing them is enough
+    with zipfile.ZipFile(target, "w", zipfile.ZIP_STORED) as archive:
+
+        for name, heading, cells in sheets:
+
+            filename = _sheet_title(name, used)
+
+            with archive.open(f"{filename}_timetable.xlsx", "w") as member:
+                write_workbook([(name, heading, cells)], member)
+
+
+def owners(by):
+    """(id, name) of every class or teacher, sorted by name."""
+
+    model = Class if by == "class" else Teacher
+
+    return db.session.query(model.id, model.name).order_by(model.name).all()
+
+
+def export_timetables(by, owner_list, target, fmt="xlsx"):
+    """
+    Writes the timetables of owner_list, (id, name) pairs of classes or
+    teachers, to the file object target as one multi-sheet workbook
+    (fmt="xlsx") or a zip of one workbook each (fmt="zip").
+    """
+
+    if by not in ("class", "teacher"):
+        raise ValueError(f"Unknown export target: {by}")
+
+    if fmt not in ("xlsx", "zip"):
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    sheets = _sheets(by, owner_list)
+
+    if fmt == "zip":
+        write_zip(sheets, target)
+    else:
+        write_workbook(sheets, target)
@@ -0,0 +1,143 @@
+import threading
+
+from models import db, Class, Teacher, TimetableEntry
+
+
+PAGE_SIZE = 48
+
+_lock = threading.Lock()
+_directory = None
+
+# bumped on every invalidation so a directory built from data that
+# changed while it was being built is never stored
+_generation = 0
+
+
+def department_of(class_name):
+    """
+    Department code in a class name, e.g. "S8_CSE" -> "CSE" and
+    "S6_CSE_A" -> "CSE". Returns None when there is none.
+    """
+
+    parts = class_name.replace("-", "_").split("_")
+
+    if len(parts) < 2:
+        return None
+
+    last = parts[-1].upper()
+
+    # if last part is a section letter, take the one before it
+    dept = parts[-2].upper() if len(last) == 1 else last
+
+    return dept if len(dept) > 1 else None
+
+
+def build_directory():
+    """
+    Builds every teacher with the departments of the classes they teach
+    from one grouped query, sorted by name.
+    """
+
+    rows = (
+        db.session.query(Teacher.id, Teacher.name, Class.name)
+        .outerjoin(TimetableEntry, TimetableEntry.teacher_id == Teacher.id)
+        .outerjoin(Class, TimetableEntry.class_id == Class.id)
+        .group_by(Teacher.id, Class.id)
+        .order_by(Teacher.name, Teacher.id)
+    )
+
+    faculty = []
+    by_id = {}
+
+    for teacher_id, name, class_name in rows:
+
+        item = by_id.get(teacher_id)
+
+        if item is None:
+
+            item = by_id[teacher_id] = {
+                "id": teacher_id,
+                "name": name,
+                "search": name.lower(),
+                "departments": set()
+            }
+
+            faculty.append(item)
+
+        dept = department_of(class_name) if class_name else None
+
+        if dept:
+            item["departments"].add(dept)
+
+    departments = set()
+
+    for item in faculty:
+        departments.update(item["departments"])
+        item["departments"] = sorted(item["departments"])
+
+    return {"faculty": faculty, "departments": sorted(departments)}
+
+
+def get_directory():
+    """
+    Returns the cached directory, building it on first use after an
+    invalidation. Callers must treat it as read-only.
+    """
+
+    global _directory
+
+    directory = _directory
+
+    if directory is not None:
+        return directory
+
+    with _lock:
+
+        if _directory is not None:
+            return _directory
+
+        generation = _generation
+        directory = build_directory()
+
+        if generation == _generation:
+            _directory = directory
+
+    return directory
+
+
+def invalidate_faculty_directory():
+
+    global _directory, _generation
+
+    _generation += 1
+    _directory = None
+
+
+def search_faculty(query="", department=None, page=1, per_page=PAGE_SIZE):
+    """
+    One page of the directory, filtered by a case-insensitive name
+    substring and a department. page is clamped to the pages there are.
+    """
+
+    directory = get_directory()
+
+    query = (query or "").strip().lower()
+
+    matches = [
+        item for item in directory["faculty"]
+        if (not query or query in item["search"])
+        and (not department or department in item["departments"])
+    ]
+
+    pages = max(1, -(-len(matches) // per_page))
+    page = min(max(1, page), pages)
+    start = (page - 1) * per_page
+
+    return {
+        "items": matches[start:start + per_page],
+        "total": len(matches),
+        "size": len(directory["faculty"]),
+        "departments": directory["departments"],
+        "page": page,
+        "pages": pages
+    }
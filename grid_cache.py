@@ -0,0 +1,134 @@
+import threading
+
+from models import db, Class, Subject, Teacher, Room, TimetableEntry
+from queries import room_overrides
+from timeslots import slot_table
+
+
+# weeks kept at once; the horizon plus the week being looked back on
+MAX_WEEKS = 8
+
+_lock = threading.Lock()
+
+# week start (None for the weekly template) -> grid
+_grids = {}
+
+# bumped on every invalidation so a grid built from data that changed
+# while it was being built is never stored
+_generation = 0
+
+
+def build_floating_grid(dates=None):
+    """
+    Builds the class -> day -> slot -> cells grid shown by the floating
+    timetable views with one joined query. Cells with the same subject,
+    batch and lab rooms are merged and list all of their teachers.
+
+    With dates, the rooms of those dates (DatedRoom) replace the weekly
+    template where they differ.
+    """
+
+    overrides = room_overrides(dates) if dates else {}
+
+    rows = (
+        db.session.query(
+            TimetableEntry.id,
+            Class.name,
+            TimetableEntry.day_code,
+            TimetableEntry.slot_code,
+            Subject.name,
+            Teacher.name,
+            Room.name,
+            TimetableEntry.lab_rooms,
+            TimetableEntry.batch
+        )
+        .join(Class, TimetableEntry.class_id == Class.id)
+        .outerjoin(Subject, TimetableEntry.subject_id == Subject.id)
+        .outerjoin(Teacher, TimetableEntry.teacher_id == Teacher.id)
+        .outerjoin(Room, TimetableEntry.room_id == Room.id)
+        .order_by(
+            TimetableEntry.class_id,
+            TimetableEntry.day_code,
+            TimetableEntry.slot_code,
+            TimetableEntry.id
+        )
+    )
+
+    timetable = {}
+    cells = {}
+
+    for entry_id, class_name, day, slot, subject, teacher, room, lab_rooms, batch in rows:
+
+        if entry_id in overrides:
+            room = overrides[entry_id]
+
+        day = slot_table.day_label(day)
+        slot = slot_table.slot_label(slot)
+        subject = subject or "-"
+
+        key = (class_name, day, slot, subject, batch, lab_rooms)
+        item = cells.get(key)
+
+        if item is None:
+
+            item = cells[key] = {
+                "subject": subject,
+                "room": room or "-",
+                "lab_rooms": lab_rooms,
+                "batch": batch,
+                "teachers": []
+            }
+
+            (
+                timetable
+                .setdefault(class_name, {})
+                .setdefault(day, {})
+                .setdefault(slot, [])
+                .append(item)
+            )
+
+        if teacher and teacher not in item["teachers"]:
+            item["teachers"].append(teacher)
+
+    class_map = dict(db.session.query(Class.name, Class.id))
+
+    return {"timetable": timetable, "class_map": class_map}
+
+
+def get_floating_grid(start=None, dates=None):
+    """
+    Returns the cached grid of the week starting on start with the rooms
+    of its dates, or of the weekly template when start is None, building
+    it on first use after an invalidation. Callers must treat it as
+    read-only.
+    """
+
+    grid = _grids.get(start)
+
+    if grid is not None:
+        return grid
+
+    with _lock:
+
+        if start in _grids:
+            return _grids[start]
+
+        generation = _generation
+        grid = build_floating_grid(dates)
+
+        if generation == _generation:
+
+            if len(_grids) >= MAX_WEEKS:
+                _grids.clear()
+
+            _grids[start] = grid
+
+    return grid
+
+
+def invalidate_floating_grid():
+
+    global _generation
+
+    _generation += 1
+    _grids.clear()
@@ -0,0 +1,168 @@
+from datetime import date, timedelta
+from functools import partial
+
+from models import db, DatedRoom
+from allocator import load_snapshot, plan_rooms
+from cancellations import cancellation_index
+from grid_cache import invalidate_floating_grid
+from parallel import parallel_map
+from timeslots import DAYS, slot_table
+
+
+# how far ahead per-date rooms are materialized
+HORIZON_WEEKS = 4
+
+# below this many dates a process pool costs more than it saves
+PARALLEL_MIN = 8
+
+
+def horizon(today=None):
+    """First and last date of the rolling horizon, inclusive."""
+
+    today = today or date.today()
+
+    return today, today + timedelta(weeks=HORIZON_WEEKS, days=-1)
+
+
+def week_start(d=None):
+    """
+    Monday of the week d falls in. Days after the last teaching day
+    (Sunday) belong to the coming week.
+    """
+
+    d = d or date.today()
+
+    if d.weekday() >= len(DAYS):
+        d += timedelta(days=7 - d.weekday())
+
+    return d - timedelta(days=d.weekday())
+
+
+def week_dates(start):
+    """The teaching days of the week starting on Monday start."""
+
+    return [start + timedelta(days=i) for i in range(len(DAYS))]
+
+
+def plan_date(snapshot, cancelled, strategy="greedy"):
+    """
+    Rooms on one date with cancelled, its (class_id, day_code, slot_code)
+    cancellations, as {entry_id: room_id or None} for the entries whose
+    room differs from the weekly template. Each (day, slot) is allocated
+    independently, so only the slots the cancellations touch are planned.
+    """
+
+    touched = {(day, slot) for _, day, slot in cancelled}
+
+    if not touched:
+        return {}
+
+    rooms = plan_rooms(
+        snapshot,
+        cancelled=cancelled,
+        changed_slots=touched,
+        strategy=strategy,
+        workers=1
+    )
+
+    return {
+        e.id: rooms[e.id]
+        for e in snapshot.entries
+        if e.id in rooms and rooms[e.id] != e.room_id
+    }
+
+
+def plan_dates(snapshot, cancelled_by_date, strategy="greedy", workers=None):
+    """
+    plan_date() for every {date: cancelled} item, as {date: plan}. Dates
+    are independent of each other, so many are spread over a process
+    pool; workers caps it.
+    """
+
+    dates = list(cancelled_by_date)
+
+    plans = parallel_map(
+        partial(plan_date, snapshot, strategy=strategy),
+        [cancelled_by_date[d] for d in dates],
+        workers=workers,
+        min_items=PARALLEL_MIN
+    )
+
+    return dict(zip(dates, plans))
+
+
+def dates_in_slots(slots):
+    """
+    Dates in the horizon with a cancellation in any of slots, a set of
+    (day_code, slot_code): the dates whose plan an entry change in those
+    slots can alter.
+    """
+
+    first, last = horizon()
+
+    return [
+        d
+        for d in cancellation_index.dates()
+        if first <= d <= last
+        and any((day, slot) in slots for _, day, slot in cancellation_index.on_date(d))
+    ]
+
+
+def allocate_dates(dates=None, strategy="greedy", workers=None):
+    """
+    Materializes the rooms of each date in the horizon on top of the
+    weekly template, as DatedRoom rows for the entries whose room differs
+    on that date. Only dates with cancellations differ.
+
+    dates limits the run to those dates; by default the whole horizon is
+    rebuilt, which the server does at startup and then daily from the job
+    runner, so views only ever read DatedRoom. Rows for dates before
+    today are dropped either way, and the result is written in one
+    commit.
+    """
+
+    first, last = horizon()
+    full = dates is None
+
+    if full:
+        dates = [d for d in cancellation_index.dates() if first <= d <= last]
+        stale = DatedRoom.date.isnot(None)
+    else:
+        dates = sorted({d for d in dates if first <= d <= last})
+        stale = DatedRoom.date.in_(dates) | (DatedRoom.date < first)
+
+    cancelled = {d: set(cancellation_index.on_date(d)) for d in dates}
+
+    snapshot = load_snapshot({
+        (day, slot)
+        for keys in cancelled.values()
+        for _, day, slot in keys
+    })
+
+    plans = plan_dates(snapshot, cancelled, strategy, workers)
+
+    entries = {e.id: e for e in snapshot.entries}
+    rows = []
+
+    for d, plan in plans.items():
+
+        for entry_id, room_id in plan.items():
+
+            e = entries[entry_id]
+            where = f"{snapshot.class_names[e.class_id]} | {d} {slot_table.slot_label(e.slot_code)}"
+
+            if room_id is None:
+                print(f"❌ Cancelled | {where} | freeing room {snapshot.room_names.get(e.room_id, '-')}")
+            else:
+                print(f"✔ Allocated | {where} | {snapshot.room_names[room_id]}")
+
+            rows.append({"date": d, "entry_id": entry_id, "room_id": room_id})
+
+    DatedRoom.query.filter(stale).delete(synchronize_session=False)
+
+    if rows:
+        db.session.bulk_insert_mappings(DatedRoom, rows)
+
+    db.session.commit()
+
+    invalidate_floating_grid()
@@ -1,15 +1,27 @@
+import numpy as np
 import pandas as pd
-from models import db, Class, Room, Teacher, Subject, TimetableEntry, User,TeachingAssignment
-from utils.normalize import normalize_slot, normalize_subject
-
-def normalize(df):
-    df.columns = (
-        df.columns.astype(str)
-        .str.strip()
-        .str.lower()
-        .str.replace(" ", "_")
-    )
-    return df
+from collections import deque
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.security import generate_password_hash
+from models import (
+    db, Class, Room, Teacher, Subject, TimetableEntry, User,
+    TeachingAssignment, CancelledClass, DatedRoom, LabRoomBooking
+)
+from utils.normalize import (
+    normalize_slot, normalize_subject,
+    normalize_slots, normalize_subjects, split_lab_rooms
+)
+from workbook_loader import load_workbooks
+from grid_cache import invalidate_floating_grid
+from faculty_directory import invalidate_faculty_directory
+from dashboard_stats import refresh_dashboard_stats
+from export_cache import bump_timetable_version
+from timeslots import slot_table
+from cancellations import cancellation_index
+
+# password every new account of a role starts with
+DEFAULT_PASSWORDS = {"teacher": "teacher123", "student": "student123"}
 
 
 def get_class_column(df):
@@ -25,95 +37,163 @@ def get_slot_column(df):
             return c
     raise ValueError(f"No slot column found. Columns: {list(df.columns)}")
 
-def delete_base_entry(class_id, day, slot):
+def _first(values):
+    return values[0] if values else None
 
-    base_entries = TimetableEntry.query.filter(
-        TimetableEntry.class_id == class_id,
-        TimetableEntry.day == day,
-        TimetableEntry.slot == slot,
-        TimetableEntry.batch.is_(None),
-        TimetableEntry.is_lab_hour == False
-    ).all()
 
-    for e in base_entries:
-        db.session.delete(e)
+def melt_timetable_sheet(df):
+    """
+    Melts one class sheet into long form with one row per filled cell.
+    Returns raw (days, slots, subjects) arrays in the sheet's reading
+    order (row by row, then left to right).
+    """
 
+    values = df.iloc[:, 1:].to_numpy(dtype=object)
+    rows, cols = values.shape
 
-def process_inputs():
+    filled = pd.notna(values).ravel()
 
-    print("\n========== INPUT PROCESSOR START ==========\n")
+    return (
+        np.repeat(df.iloc[:, 0].to_numpy(dtype=object), cols)[filled],
+        np.tile(df.columns[1:].to_numpy(dtype=object), rows)[filled],
+        values.ravel()[filled]
+    )
 
-    TimetableEntry.query.delete()
-    TeachingAssignment.query.delete() 
-    Subject.query.delete()
-    Teacher.query.delete()
-    Room.query.delete()
-    Class.query.delete()
-    db.session.commit()
 
-    df = normalize(pd.read_excel("uploads/class_strength.xlsx"))
-    class_col = get_class_column(df)
+def parse_class_types(df):
 
-    class_map = {}
+    return pd.DataFrame({
+        "subject": normalize_subjects(df["subject"]),
+        "type": df["type"].astype(str).str.lower()
+    }).drop_duplicates("subject", keep="last")
 
-    for _, r in df.iterrows():
 
-        cls = Class(
-            name=str(r[class_col]).strip(),
-            strength=int(r["strength"]),
-            class_category=str(r["class_category"]).lower()
+def parse_lab_rooms(df):
+    """
+    lab_rooms.xlsx as {(class, subject): rooms text}. A later row for
+    the same class and subject replaces an earlier one.
+    """
+
+    class_col = get_class_column(df)
+    subject_col = "subject" if "subject" in df.columns else "subject_name"
+
+    return {
+        (str(class_name).strip(), subject): str(rooms).strip()
+        for class_name, subject, rooms in zip(
+            df[class_col],
+            normalize_subjects(df[subject_col]),
+            df["rooms"]
         )
+    }
 
-        db.session.add(cls)
-        db.session.flush()
 
-        class_map[cls.name] = cls
+def parse_timetables(sheets, class_names, class_types):
+    """
+    Long-form cells of every class sheet, classified as
+    activity / lab / theory by joining against class_types.
+    """
 
-    df = normalize(pd.read_excel("uploads/room_mapping.xlsx"))
-    class_col = get_class_column(df)
+    classes, days, slots, subjects = [], [], [], []
 
-    for _, r in df.iterrows():
+    for sheet, df in sheets.items():
 
-        class_name = str(r[class_col]).strip()
+        sheet_name = sheet.strip()
 
-        cls = class_map.get(class_name)
+        if sheet_name not in class_names:
+            continue
+
+        sheet_days, sheet_slots, sheet_subjects = melt_timetable_sheet(df)
+
+        classes.append(np.full(len(sheet_days), sheet_name, dtype=object))
+        days.append(sheet_days)
+        slots.append(sheet_slots)
+        subjects.append(sheet_subjects)
 
-        room_name = str(r["room"]).strip()
-        capacity = int(r["capacity"])
+    if not classes:
+        return pd.DataFrame(columns=["class", "day", "slot", "subject", "kind"])
 
-        if cls:
+    cells = pd.DataFrame({
+        "class": np.concatenate(classes),
+        "day": np.concatenate(days),
+        "slot": np.concatenate(slots),
+        "subject": np.concatenate(subjects)
+    })
 
-            db.session.add(Room(
-                name=room_name,
-                capacity=capacity,
-                is_permanent=True,
-                owner_class_id=cls.id
-            ))
+    cells["day"] = cells["day"].astype(str).str.strip().str.upper()
+    cells["slot"] = normalize_slots(cells["slot"])
+    cells["subject"] = normalize_subjects(cells["subject"])
 
-        else:
+    cells = cells.merge(class_types, on="subject", how="left")
+
+    cells["kind"] = np.select(
+        [
+            cells["subject"].isin(["activity", "activity_hour"]),
+            cells["type"] == "lab"
+        ],
+        ["activity", "lab"],
+        default="theory"
+    )
 
-            db.session.add(Room(
-                name=room_name,
-                capacity=capacity,
-                is_permanent=False,
-                owner_class_id=None
-            ))
+    return cells.drop(columns="type")
 
-    df = normalize(pd.read_excel("uploads/class_type.xlsx"))
 
-    subject_type = {
-        normalize_subject(r["subject"]): str(r["type"]).lower()
-        for _, r in df.iterrows()
+def build_import_plan(frames):
+    """
+    Resolves the parsed upload workbooks (see load_workbooks) in memory.
+
+    Rows refer to each other by natural key (class name, teacher name,
+    subject name) so nothing has to be flushed to get an id. The plan is
+    written by write_import_plan().
+    """
+
+    plan = {
+        "classes": [],
+        "rooms": [],
+        "teachers": [],
+        "subjects": {},
+        "assignments": [],
+        "entries": [],
+        "teacher_users": [],
+        "students": []
     }
 
-    df = pd.read_excel("uploads/teacher_subject_mapping.xlsx")
+    df = frames["class_strength"]
+    class_col = get_class_column(df)
 
-    df.columns = (
-        df.columns.astype(str)
-        .str.strip()
-        .str.lower()
-        .str.replace(" ", "_")
-    )
+    class_map = {}
+
+    for _, r in df.iterrows():
+
+        cls = {
+            "name": str(r[class_col]).strip(),
+            "strength": int(r["strength"]),
+            "class_category": str(r["class_category"]).lower()
+        }
+
+        plan["classes"].append(cls)
+        class_map[cls["name"]] = cls
+
+    df = frames["room_mapping"]
+    class_col = get_class_column(df)
+
+    for _, r in df.iterrows():
+
+        class_name = str(r[class_col]).strip()
+
+        cls = class_map.get(class_name)
+
+        plan["rooms"].append({
+            "name": str(r["room"]).strip(),
+            "capacity": int(r["capacity"]),
+            "is_permanent": cls is not None,
+            "owner": class_name if cls else None
+        })
+
+    class_types = parse_class_types(frames["class_type"])
+
+    subject_type = dict(zip(class_types["subject"], class_types["type"]))
+
+    df = frames["teacher_subject"]
 
     print("Teacher Mapping Columns:", df.columns.tolist())
 
@@ -123,8 +203,19 @@ def process_inputs():
         if col not in df.columns:
             raise Exception(f"Column '{col}' missing in teacher_subject_mapping.xlsx")
 
-    teacher_map = {}
-    subject_map = {}
+    subjects = plan["subjects"]
+    teachers = set()
+    assignments = set()
+
+    # (subject, class) -> teachers, in assignment order
+    class_teachers = {}
+
+    def get_subject(name, is_lab=False):
+
+        if name not in subjects:
+            subjects[name] = {"name": name, "is_lab": is_lab, "teacher": None}
+
+        return subjects[name]
 
     for _, r in df.iterrows():
 
@@ -140,227 +231,116 @@ def process_inputs():
         if not faculty or not subject_name or not class_name:
             continue
 
-        cls = class_map.get(class_name)
-
-        if not cls:
+        if class_name not in class_map:
             continue
-        teacher = teacher_map.get(faculty)
 
-        if not teacher:
+        if faculty not in teachers:
 
-            teacher = Teacher(name=faculty)
+            teachers.add(faculty)
+            plan["teachers"].append(faculty)
 
-            db.session.add(teacher)
-            db.session.flush()
+            plan["teacher_users"].append({
+                "email": faculty.lower().replace(" ", "") + "@college.edu",
+                "teacher": faculty
+            })
 
-            teacher_map[faculty] = teacher
+        subject = get_subject(
+            subject_name,
+            is_lab=(subject_type.get(subject_name) == "lab")
+        )
+        subject["teacher"] = faculty
 
-            email = faculty.lower().replace(" ", "") + "@college.edu"
+        key = (faculty, subject_name, class_name)
 
-            existing_user = User.query.filter_by(email=email).first()
+        if key not in assignments:
 
-            if not existing_user:
+            assignments.add(key)
+            plan["assignments"].append(key)
 
-                teacher_user = User(
-                    email=email,
-                    role="teacher",
-                    teacher_id=teacher.id
-                )
+            class_teachers.setdefault(
+                (subject_name, class_name), []
+            ).append(faculty)
 
-                teacher_user.set_password("teacher123")
+    entries = plan["entries"]
 
-                db.session.add(teacher_user)
+    cells = parse_timetables(frames["timetables"], class_map, class_types)
 
-        subject = Subject.query.filter_by(name=subject_name).first()
+    lab_rooms = (
+        parse_lab_rooms(frames["lab_rooms"]) if "lab_rooms" in frames else {}
+    )
 
-        if not subject:
-            subject = Subject(
-                name=subject_name,
-                is_lab=(subject_type.get(subject_name) == "lab"),
-                teacher_id=teacher.id
-            )
-            db.session.add(subject)
-            db.session.flush()
-        else:
-            subject.teacher_id = teacher.id
-
-        subject_map[subject_name] = subject
-        existing_assignment = TeachingAssignment.query.filter_by(
-            teacher_id=teacher.id,
-            subject_id=subject.id,
-            class_id=cls.id
-        ).first()
-
-        if not existing_assignment:
-
-            assignment = TeachingAssignment(
-                teacher_id=teacher.id,
-                subject_id=subject.id,
-                class_id=cls.id
-            )
+    for class_name, day, slot, subject_name, kind in cells.itertuples(
+        index=False
+    ):
 
-            db.session.add(assignment)
+        cls = class_map[class_name]
+        is_floating = cls["class_category"] == "floating"
 
-    db.session.commit()
+        entry = {
+            "class": class_name,
+            "subject": None,
+            "teacher": None,
+            "owner_room": False,
+            "day": day,
+            "slot": slot,
+            "batch": None,
+            "lab_rooms": None,
+            "is_lab_hour": False,
+            "is_floating": False
+        }
 
-    print("Teachers, subjects, and teaching assignments processed successfully!")
+        if kind == "activity":
 
-    xls = pd.ExcelFile("uploads/timetables.xlsx")
+            entries.append(entry)
 
-    for sheet in xls.sheet_names:
+            continue
 
-        sheet_name = sheet.strip()
+        is_lab = kind == "lab"
+
+        get_subject(subject_name, is_lab=is_lab)
+
+        entry["subject"] = subject_name
+        entry["is_floating"] = is_floating
+
+        teachers_for_class = class_teachers.get((subject_name, class_name), [])
+
+        if is_lab:
+
+            entry["is_lab_hour"] = True
+            entry["lab_rooms"] = lab_rooms.get((class_name, subject_name))
+
+            for teacher in teachers_for_class or [None]:
+                entries.append(dict(entry, teacher=teacher))
 
-        if sheet_name not in class_map:
             continue
 
-        cls = class_map[sheet_name]
-
-        df = normalize(pd.read_excel(xls, sheet_name=sheet))
-
-        day_col = df.columns[0]
-        slots = df.columns[1:]
-
-        for _, row in df.iterrows():
-
-            day = str(row[day_col]).strip().upper()
-
-            for slot in slots:
+        entry["teacher"] = _first(teachers_for_class)
+        entry["owner_room"] = cls["class_category"] == "permanent"
 
-                raw_slot = normalize_slot(slot)
-                value = row[slot]
-
-                if pd.isna(value):
-                    continue
-
-                subject_name = normalize_subject(value)
+        entries.append(entry)
 
-                if subject_name in ["activity", "activity_hour"]:
-
-                    db.session.add(TimetableEntry(
-                        class_id=cls.id,
-                        subject_id=None,
-                        teacher_id=None,
-                        room_id=None,
-                        day=day,
-                        slot=raw_slot
-                    ))
-
-                    continue
-
-                if subject_type.get(subject_name) == "lab":
-
-                    subject = subject_map.get(subject_name)
-
-                    if subject is None:
-                        subject = Subject.query.filter_by(name=subject_name).first()
-
-                    if subject is None:
-                        subject = Subject(
-                            name=subject_name,
-                            is_lab=(subject_type.get(subject_name) == "lab")
-                        )
-                        db.session.add(subject)
-                        db.session.flush()
-
-                    subject_map[subject_name] = subject
-
-                    assignments = TeachingAssignment.query.filter_by(
-                        subject_id=subject.id,
-                        class_id=cls.id
-                    ).all()
-
-                  
-                    if assignments:
-                        for assign in assignments:
-                            db.session.add(TimetableEntry(
-                                class_id=cls.id,
-                                subject_id=subject.id,
-                                teacher_id=assign.teacher_id,
-                                day=day,
-                                slot=raw_slot,
-                                lab_rooms=None,
-                                is_lab_hour=True,
-                                is_floating=(cls.class_category == "floating")
-                            ))
-                    else:
-                        db.session.add(TimetableEntry(
-                            class_id=cls.id,
-                            subject_id=subject.id,
-                            teacher_id=None,   # 🔥 THIS IS KEY
-                            day=day,
-                            slot=raw_slot,
-                            lab_rooms=None,
-                            is_lab_hour=True,
-                            is_floating=(cls.class_category == "floating")
-                        ))
-                    continue
-
-                subject = Subject.query.filter_by(name=subject_name).first()
-
-                if subject is None:
-                    subject = Subject(
-                        name=subject_name,
-                        is_lab=(subject_type.get(subject_name) == "lab")
-                    )
-                    db.session.add(subject)
-                    db.session.flush()
-
-                subject_map[subject_name] = subject
-
-                if subject is None:
-                    subject = Subject(
-                        name=subject_name,
-                        is_lab=(subject_type.get(subject_name) == "lab")
-                    )
-                    db.session.add(subject)
-                    db.session.flush()
-
-                if subject is None:
-                    subject = Subject(name=subject_name)
-                    db.session.add(subject)
-                    db.session.flush()
-
-                subject_map[subject_name] = subject
-
-                room_id = None
-
-                if cls.class_category == "permanent":
-
-                    room = Room.query.filter_by(
-                        owner_class_id=cls.id
-                    ).first()
-
-                    if room:
-                        room_id = room.id
-
-                assignment = TeachingAssignment.query.filter_by(
-                    subject_id=subject.id,
-                    class_id=cls.id
-                ).first()
-
-                teacher_id = assignment.teacher_id if assignment else None
-                db.session.add(TimetableEntry(
-                    class_id=cls.id,
-                    subject_id=subject.id,
-                    teacher_id=teacher_id,
-                    room_id=room_id,
-                    day=day,
-                    slot=raw_slot,
-                    is_floating=(cls.class_category == "floating")
-                ))
-
-
-    df = normalize(pd.read_excel("uploads/parallel_classes.xlsx"))
+    df = frames["parallel_classes"]
 
     class_col = get_class_column(df)
     slot_col = get_slot_column(df)
 
+    # base (non-batch, non-lab) entries per (class, day, slot), which a
+    # parallel batch replaces
+    base_entries = {}
+
+    for i, e in enumerate(entries):
+        if e["batch"] is None and not e["is_lab_hour"]:
+            base_entries.setdefault(
+                (e["class"], e["day"], e["slot"]), []
+            ).append(i)
+
+    replaced = set()
+
     for _, r in df.iterrows():
 
-        cls = class_map.get(str(r[class_col]).strip())
+        class_name = str(r[class_col]).strip()
 
-        if not cls:
+        if class_name not in class_map:
             continue
 
         subject_name = normalize_subject(r["subject"])
@@ -368,34 +348,29 @@ def process_inputs():
         slot = normalize_slot(r[slot_col])
         batch = str(r["batch"]).strip()
 
-        delete_base_entry(cls.id, day, slot)
-
-        subject = subject_map.get(subject_name)
+        replaced.update(base_entries.pop((class_name, day, slot), []))
 
-        if subject is None:
-            subject = Subject(name=subject_name)
-            db.session.add(subject)
-            db.session.flush()
-            subject_map[subject_name] = subject
+        get_subject(subject_name)
 
-        assignment = TeachingAssignment.query.filter_by(
-            subject_id=subject.id,
-            class_id=cls.id
-        ).first()
+        entries.append({
+            "class": class_name,
+            "subject": subject_name,
+            "teacher": _first(class_teachers.get((subject_name, class_name), [])),
+            "owner_room": False,
+            "day": day,
+            "slot": slot,
+            "batch": batch,
+            "lab_rooms": None,
+            "is_lab_hour": False,
+            "is_floating": True
+        })
 
+    if replaced:
+        plan["entries"] = [
+            e for i, e in enumerate(entries) if i not in replaced
+        ]
 
-        teacher_id = assignment.teacher_id if assignment else None
-        db.session.add(TimetableEntry(
-            class_id=cls.id,
-            subject_id=subject.id,
-            teacher_id=teacher_id,
-            day=day,
-            slot=slot,
-            batch=batch,
-            is_floating=True
-        ))
-
-    df = normalize(pd.read_excel("uploads/student_mapping.xlsx"))
+    df = frames["student_mapping"]
 
     class_col = get_class_column(df)
 
@@ -403,67 +378,385 @@ def process_inputs():
 
         class_name = str(r[class_col]).strip()
 
-        cls = class_map.get(class_name)
-
-        if not cls:
+        if class_name not in class_map:
             continue
 
-        email = str(r["email"]).strip().lower()
+        plan["students"].append({
+            "email": str(r["email"]).strip().lower(),
+            "class": class_name
+        })
+
+    return plan
+
+
+def _delete_ids(model, ids, chunk=500):
+
+    for i in range(0, len(ids), chunk):
+        model.query.filter(model.id.in_(ids[i:i + chunk])).delete(
+            synchronize_session=False
+        )
+
+
+def sync_table(model, rows, key_fields, update_fields=()):
+    """
+    Makes a table hold exactly rows, touching only what differs.
+
+    Existing rows are matched to incoming ones by key_fields (duplicate
+    keys are paired off in id order). Matched rows keep their id and only
+    changed update_fields are written; an update field missing from an
+    incoming row is left as it is. Unmatched existing rows are deleted,
+    unmatched incoming rows are inserted. Every incoming row gets its
+    "id" filled in. Returns (inserted, updated, deleted ids).
+    """
 
-        if User.query.filter_by(email=email).first():
+    columns = ["id", *key_fields, *update_fields]
+
+    existing = {}
+
+    for values in (
+        db.session.query(*[getattr(model, c) for c in columns])
+        .order_by(model.id)
+    ):
+        row = dict(zip(columns, values))
+        existing.setdefault(
+            tuple(row[f] for f in key_fields), deque()
+        ).append(row)
+
+    inserts = []
+    updates = []
+
+    for row in rows:
+
+        matches = existing.get(tuple(row[f] for f in key_fields))
+
+        if not matches:
+            inserts.append(row)
             continue
 
-        student_user = User(
-            email=email,
-            role="student",
-            class_id=cls.id
+        current = matches.popleft()
+        row["id"] = current["id"]
+
+        changed = {
+            f: row[f]
+            for f in update_fields
+            if f in row and row[f] != current[f]
+        }
+
+        if changed:
+            updates.append(dict(changed, id=current["id"]))
+
+    deleted = [row["id"] for matches in existing.values() for row in matches]
+
+    _delete_ids(model, deleted)
+
+    if updates:
+        db.session.bulk_update_mappings(model, updates)
+
+    if inserts:
+        db.session.bulk_insert_mappings(model, inserts, return_defaults=True)
+
+    print(
+        f"{model.__name__}: {len(inserts)} inserted, "
+        f"{len(updates)} updated, {len(deleted)} deleted"
+    )
+
+    return inserts, updates, deleted
+
+
+def write_import_plan(plan):
+    """
+    Writes a plan from build_import_plan() table by table with
+    sync_table(), so on a populated database only the differences are
+    written and unchanged rows keep their ids. Parent tables get their
+    ids back, so child rows are resolved from dicts instead of queries.
+
+    Returns the (day_code, slot_code) pairs whose entries changed, for
+    replanning only the dates they touch, or None when classes or rooms
+    changed and every date has to be planned again.
+    """
+
+    classes = [dict(c) for c in plan["classes"]]
+    *class_changes, removed_classes = sync_table(
+        Class, classes, ["name"], ["strength", "class_category"]
+    )
+    class_ids = {c["name"]: c["id"] for c in classes}
+
+    if removed_classes:
+
+        CancelledClass.query.filter(
+            CancelledClass.class_id.in_(removed_classes)
+        ).delete(synchronize_session=False)
+
+        User.query.filter(User.class_id.in_(removed_classes)).update(
+            {"class_id": None}, synchronize_session=False
         )
 
-        student_user.set_password("student123")
+    rooms = [
+        {
+            "name": r["name"],
+            "capacity": r["capacity"],
+            "is_permanent": r["is_permanent"],
+            "owner_class_id": class_ids.get(r["owner"])
+        }
+        for r in plan["rooms"]
+    ]
+    room_changes = sync_table(
+        Room, rooms, ["name", "owner_class_id"], ["capacity", "is_permanent"]
+    )
 
-        db.session.add(student_user)
+    owner_rooms = {}
 
+    for r in rooms:
+        if r["owner_class_id"] is not None:
+            owner_rooms.setdefault(r["owner_class_id"], r["id"])
 
-    db.session.commit()
+    teachers = [{"name": name} for name in plan["teachers"]]
+    _, _, removed_teachers = sync_table(Teacher, teachers, ["name"])
+    teacher_ids = {t["name"]: t["id"] for t in teachers}
 
-    print("\n========== INPUT PROCESSOR DONE ==========\n")
+    if removed_teachers:
+        User.query.filter(User.teacher_id.in_(removed_teachers)).update(
+            {"teacher_id": None}, synchronize_session=False
+        )
 
-def process_lab_rooms():
+    subjects = [
+        {
+            "name": s["name"],
+            "is_lab": s["is_lab"],
+            "teacher_id": teacher_ids.get(s["teacher"])
+        }
+        for s in plan["subjects"].values()
+    ]
+    sync_table(Subject, subjects, ["name"], ["is_lab", "teacher_id"])
+    subject_ids = {s["name"]: s["id"] for s in subjects}
+
+    sync_table(
+        TeachingAssignment,
+        [
+            {
+                "teacher_id": teacher_ids[teacher],
+                "subject_id": subject_ids[subject],
+                "class_id": class_ids[class_name]
+            }
+            for teacher, subject, class_name in plan["assignments"]
+        ],
+        ["teacher_id", "subject_id", "class_id"]
+    )
 
-    import os
+    print("Teachers, subjects, and teaching assignments processed successfully!")
 
-    path = "uploads/lab_rooms.xlsx"
+    entries = []
 
-    if not os.path.exists(path):
-        print("No lab_rooms.xlsx file found")
-        return
+    for e in plan["entries"]:
 
-    df = normalize(pd.read_excel(path))
+        class_id = class_ids[e["class"]]
 
-    class_col = get_class_column(df)
+        entry = {
+            "class_id": class_id,
+            "subject_id": subject_ids.get(e["subject"]),
+            "teacher_id": teacher_ids.get(e["teacher"]),
+            "day_code": slot_table.day_code(e["day"]),
+            "slot_code": slot_table.slot_code(e["slot"]),
+            "batch": e["batch"],
+            "lab_rooms": e["lab_rooms"],
+            "is_lab_hour": e["is_lab_hour"],
+            "is_floating": e["is_floating"]
+        }
 
-    for _, r in df.iterrows():
+        # floating rooms belong to the allocator, keep whatever it set
+        if not e["is_floating"]:
+            entry["room_id"] = (
+                owner_rooms.get(class_id) if e["owner_room"] else None
+            )
 
-        class_name = str(r[class_col]).strip()
-        subject_col = "subject" if "subject" in df.columns else "subject_name"
-        subject_name = normalize_subject(r[subject_col])
-        lab_rooms = str(r["rooms"]).strip()
+        entries.append(entry)
 
-        cls = Class.query.filter_by(name=class_name).first()
-        subject = Subject.query.filter_by(name=subject_name).first()
+    # where the entries about to be deleted were
+    slots_before = {
+        entry_id: (day, slot)
+        for entry_id, day, slot in db.session.query(
+            TimetableEntry.id, TimetableEntry.day_code, TimetableEntry.slot_code
+        )
+    }
 
-        if not cls or not subject:
-            continue
+    inserted, updated, deleted = sync_table(
+        TimetableEntry,
+        entries,
+        [
+            "class_id", "subject_id", "teacher_id", "day_code", "slot_code",
+            "batch", "is_lab_hour", "is_floating"
+        ],
+        ["room_id", "lab_rooms"]
+    )
 
-        entries = TimetableEntry.query.filter(
-            TimetableEntry.class_id == cls.id,
-            TimetableEntry.subject_id == subject.id,
-            TimetableEntry.is_lab_hour == True
-        ).all()
+    # lab rooms that are also rooms, as references the allocator can use
+    room_ids = {}
+
+    for r in rooms:
+        room_ids.setdefault(r["name"], r["id"])
 
-        for e in entries:
-            e.lab_rooms = lab_rooms
+    bookings = [
+        {"entry_id": e["id"], "room_id": room_ids[name]}
+        for e in entries
+        if e["lab_rooms"]
+        for name in split_lab_rooms(e["lab_rooms"])
+        if name in room_ids
+    ]
+    sync_table(LabRoomBooking, bookings, ["entry_id", "room_id"])
 
+    if any(class_changes) or removed_classes or any(room_changes):
+
+        # room ids and class strengths feed every date's plan
+        DatedRoom.query.delete()
+
+        return None
+
+    # per-date rooms of deleted entries; ids may be reused by new entries
+    for i in range(0, len(deleted), 500):
+        DatedRoom.query.filter(
+            DatedRoom.entry_id.in_(deleted[i:i + 500])
+        ).delete(synchronize_session=False)
+
+    by_id = {e["id"]: e for e in entries}
+
+    # lab_rooms is an update field, so changed bookings are covered too
+    return (
+        {(e["day_code"], e["slot_code"]) for e in inserted}
+        | {
+            (by_id[u["id"]]["day_code"], by_id[u["id"]]["slot_code"])
+            for u in updated
+        }
+        | {slots_before[entry_id] for entry_id in deleted}
+    )
+
+
+def process_inputs(frames=None, differential=False):
+    """
+    Rebuilds classes, rooms, teachers, subjects and the timetable from
+    the upload workbooks, with the lab rooms of lab entries set from
+    lab_rooms.xlsx when it was uploaded. frames are the parsed workbooks
+    from load_workbooks(); they are loaded here when not given.
+
+    With differential=True the current tables are not wiped first: only
+    rows that changed are inserted, updated or deleted, so ids,
+    cancellations and user links of unchanged rows survive.
+
+    User accounts are left to provision_users(), which takes the plan
+    this returns. plan["changed_slots"] holds the (day_code, slot_code)
+    pairs the import changed, or None when every date has to be planned
+    again (see write_import_plan()).
+    """
+
+    print("\n========== INPUT PROCESSOR START ==========\n")
+
+    if frames is None:
+        frames = load_workbooks()
+
+    plan = build_import_plan(frames)
+
+    # commits on its own, so it has to run before anything is deleted
+    slot_table.register(
+        [e["day"] for e in plan["entries"]],
+        [e["slot"] for e in plan["entries"]]
+    )
+
+    if not differential:
+
+        # these point at entries; bookings are rebuilt below, per-date
+        # rooms by the allocator
+        DatedRoom.query.delete()
+        LabRoomBooking.query.delete()
+
+        TimetableEntry.query.delete()
+        TeachingAssignment.query.delete()
+        Subject.query.delete()
+        Teacher.query.delete()
+        Room.query.delete()
+        Class.query.delete()
+
+    plan["changed_slots"] = write_import_plan(plan)
+
+    bump_timetable_version()
     db.session.commit()
 
-    print("\n========== LAB ROOMS PROCESSED ==========\n")
\ No newline at end of file
+    invalidate_floating_grid()
+    invalidate_faculty_directory()
+    cancellation_index.invalidate()
+    refresh_dashboard_stats()
+
+    print("\n========== INPUT PROCESSOR DONE ==========\n")
+
+    return plan
+
+
+def provision_users(plan):
+    """
+    Creates the teacher and student accounts of an import plan that do
+    not exist yet, with the default password of their role, and re-links
+    existing accounts whose teacher or class was dropped by an earlier
+    import and is back. Returns the number of accounts created or
+    re-linked.
+
+    Everyone of a role starts with the same password, so it is hashed
+    once per role instead of once per user. Existing emails are caught
+    by the unique email index in the same INSERT, with no lookup per row;
+    only their empty links are filled, never their password.
+    """
+
+    teacher_ids = dict(db.session.query(Teacher.name, Teacher.id))
+    class_ids = dict(db.session.query(Class.name, Class.id))
+
+    hashes = {
+        role: generate_password_hash(password)
+        for role, password in DEFAULT_PASSWORDS.items()
+    }
+
+    # first row per email wins, as when each was checked before adding
+    users = {}
+
+    for u in plan["teacher_users"]:
+        users.setdefault(u["email"], {
+            "email": u["email"],
+            "password_hash": hashes["teacher"],
+            "role": "teacher",
+            "teacher_id": teacher_ids.get(u["teacher"]),
+            "class_id": None
+        })
+
+    for u in plan["students"]:
+        users.setdefault(u["email"], {
+            "email": u["email"],
+            "password_hash": hashes["student"],
+            "role": "student",
+            "teacher_id": None,
+            "class_id": class_ids.get(u["class"])
+        })
+
+    written = []
+
+    if users:
+
+        stmt = sqlite_insert(User)
+        excluded = stmt.excluded
+
+        written = db.session.scalars(
+            stmt.on_conflict_do_update(
+                index_elements=["email"],
+                set_={
+                    "teacher_id": func.coalesce(User.teacher_id, excluded.teacher_id),
+                    "class_id": func.coalesce(User.class_id, excluded.class_id)
+                },
+                where=(
+                    (User.teacher_id.is_(None) & excluded.teacher_id.isnot(None))
+                    | (User.class_id.is_(None) & excluded.class_id.isnot(None))
+                )
+            )
+            .returning(User.id),
+            list(users.values())
+        ).all()
+
+    db.session.commit()
+
+    print(f"User accounts: {len(written)} created or re-linked, {len(users) - len(written)} unchanged")
+
+    return len(written)
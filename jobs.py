@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from models import db, Job
+
+
+# One worker: uploads and allocations rewrite the same tables, so they
+# run one after another in the order they were submitted.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job")
+
+
+def create_job(kind):
+    """
+    Records a queued job without starting it, for callers that need its
+    id first (e.g. to name the job's files). Start it with start_job().
+    """
+
+    job = Job(kind=kind, status="queued", message="Queued")
+
+    db.session.add(job)
+    db.session.commit()
+
+    return job
+
+
+def start_job(app, job, fn):
+    """
+    Runs fn(report) for a job from create_job() in the background.
+
+    fn may call report(progress, message) between its stages. Whatever
+    it returns is stored as the job result (it must be JSON serializable).
+    """
+
+    _executor.submit(_run, app, job.id, fn)
+
+    return job
+
+
+def fail_job(job, message):
+    """Marks a job that could not be started as failed."""
+
+    db.session.rollback()
+
+    job.status = "failed"
+    job.message = message[:200]
+    job.error = traceback.format_exc()
+    job.finished_at = datetime.utcnow()
+
+    db.session.commit()
+
+
+def schedule_daily(app, kind, fn):
+    """
+    Starts fn(report) as a job of kind every day just after midnight,
+    from a daemon thread. The job itself runs on the job worker like any
+    other, so it never overlaps an upload.
+    """
+
+    def loop():
+
+        while True:
+
+            now = datetime.now()
+            midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+
+            time.sleep((midnight - now).total_seconds() + 1)
+
+            with app.app_context():
+                start_job(app, create_job(kind), fn)
+
+    threading.Thread(target=loop, name=f"{kind}-daily", daemon=True).start()
+
+
+def _run(app, job_id, fn):
+
+    with app.app_context():
+
+        job = db.session.get(Job, job_id)
+        job.status = "running"
+        db.session.commit()
+
+        def report(progress, message):
+            job.progress = progress
+            job.message = message
+            db.session.commit()
+
+        try:
+            result = fn(report)
+
+        except Exception as e:
+
+            db.session.rollback()
+
+            job.status = "failed"
+            job.message = str(e)[:200]
+            job.error = traceback.format_exc()
+
+        else:
+
+            job.status = "done"
+            job.progress = 100
+            job.message = "Done"
+            job.result = json.dumps(result) if result is not None else None
+
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+def fail_stale_jobs():
+    """
+    Marks jobs left queued or running by a previous process as failed.
+    """
+
+    Job.query.filter(Job.status.in_(["queued", "running"])).update(
+        {
+            "status": "failed",
+            "message": "Interrupted by a server restart",
+            "finished_at": datetime.utcnow()
+        },
+        synchronize_session=False
+    )
+
+    db.session.commit()
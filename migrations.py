@@ -0,0 +1,170 @@
+from sqlalchemy import text
+
+from export_cache import new_token
+from models import db, SchemaMigration
+from timeslots import slot_table
+
+
+def _timetable_indexes():
+
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_timetable_entry_class_day_slot "
+        "ON timetable_entry (class_id, day, slot)",
+
+        "CREATE INDEX IF NOT EXISTS ix_timetable_entry_teacher_day_slot "
+        "ON timetable_entry (teacher_id, day, slot)",
+
+        "CREATE INDEX IF NOT EXISTS ix_timetable_entry_floating_room "
+        "ON timetable_entry (is_floating, room_id)",
+
+        "CREATE INDEX IF NOT EXISTS ix_cancelled_class_date "
+        "ON cancelled_class (date)",
+
+        # duplicates could be written before the unique index existed,
+        # keep the oldest row of each
+        "DELETE FROM cancelled_class WHERE id NOT IN ("
+        "SELECT MIN(id) FROM cancelled_class GROUP BY class_id, slot, date)",
+
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_cancelled_class_class_slot_date "
+        "ON cancelled_class (class_id, slot, date)"
+    ]
+
+    for statement in statements:
+        db.session.execute(text(statement))
+
+
+def _day_slot_codes():
+
+    columns = {
+        row[1]
+        for row in db.session.execute(text("PRAGMA table_info(timetable_entry)"))
+    }
+
+    if "day" not in columns:
+
+        # created by create_all() with codes already, only seed the table
+        slot_table.register()
+        return
+
+    if "day_code" not in columns:
+        db.session.execute(text(
+            "ALTER TABLE timetable_entry ADD COLUMN day_code INTEGER "
+            "REFERENCES day (id)"
+        ))
+        db.session.execute(text(
+            "ALTER TABLE timetable_entry ADD COLUMN slot_code INTEGER "
+            "REFERENCES time_slot (id)"
+        ))
+
+    pairs = db.session.execute(
+        text("SELECT DISTINCT day, slot FROM timetable_entry")
+    ).all()
+
+    slot_table.register(
+        [day for day, _ in pairs if day],
+        [slot for _, slot in pairs if slot]
+    )
+
+    for day, slot in pairs:
+        db.session.execute(
+            text(
+                "UPDATE timetable_entry SET day_code = :day_code, "
+                "slot_code = :slot_code WHERE day IS :day AND slot IS :slot"
+            ),
+            {
+                "day_code": slot_table.day_code(day) if day else None,
+                "slot_code": slot_table.slot_code(slot) if slot else None,
+                "day": day,
+                "slot": slot
+            }
+        )
+
+    statements = [
+        "DROP INDEX IF EXISTS ix_timetable_entry_class_day_slot",
+        "DROP INDEX IF EXISTS ix_timetable_entry_teacher_day_slot",
+
+        "ALTER TABLE timetable_entry DROP COLUMN day",
+        "ALTER TABLE timetable_entry DROP COLUMN slot",
+
+        "CREATE INDEX ix_timetable_entry_class_day_slot "
+        "ON timetable_entry (class_id, day_code, slot_code)",
+
+        "CREATE INDEX ix_timetable_entry_teacher_day_slot "
+        "ON timetable_entry (teacher_id, day_code, slot_code)"
+    ]
+
+    for statement in statements:
+        db.session.execute(text(statement))
+
+
+def _template_rooms():
+
+    # cancellations used to clear the room of permanent classes in the
+    # weekly template; they now live in dated_room, so give it back
+    db.session.execute(text(
+        "UPDATE timetable_entry SET room_id = ("
+        "SELECT MIN(room.id) FROM room "
+        "WHERE room.owner_class_id = timetable_entry.class_id) "
+        "WHERE room_id IS NULL AND is_floating = 0 AND is_lab_hour = 0 "
+        "AND subject_id IS NOT NULL AND class_id IN ("
+        "SELECT id FROM class WHERE class_category = 'permanent')"
+    ))
+
+
+def _timetable_version_token():
+
+    columns = {
+        row[1]
+        for row in db.session.execute(text("PRAGMA table_info(timetable_version)"))
+    }
+
+    if "token" not in columns:
+        db.session.execute(text(
+            "ALTER TABLE timetable_version ADD COLUMN token VARCHAR(32)"
+        ))
+
+    db.session.execute(
+        text("UPDATE timetable_version SET token = :token WHERE token IS NULL"),
+        {"token": new_token()}
+    )
+
+
+# (version, name, fn), applied in order, each exactly once per database
+MIGRATIONS = [
+    (1, "timetable and cancellation indexes", _timetable_indexes),
+    (2, "integer day and slot codes", _day_slot_codes),
+    (3, "weekly template rooms without cancellations", _template_rooms),
+    (4, "per-database token for cached exports", _timetable_version_token),
+]
+
+
+def run_migrations():
+    """
+    Brings an existing database up to the current schema.
+
+    db.create_all() only creates missing tables, so changes to tables
+    that already exist go here. Applied versions are recorded in
+    schema_migration. Returns the versions applied by this call.
+    """
+
+    applied = {
+        version for (version,) in db.session.query(SchemaMigration.version)
+    }
+
+    ran = []
+
+    for version, name, fn in MIGRATIONS:
+
+        if version in applied:
+            continue
+
+        fn()
+
+        db.session.add(SchemaMigration(version=version, name=name))
+        db.session.commit()
+
+        print(f"Applied migration {version}: {name}")
+
+        ran.append(version)
+
+    return ran
@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import json
 
 db = SQLAlchemy()
 
@@ -90,6 +91,26 @@ class TeachingAssignment(db.Model):
     subject_id = db.Column(db.Integer, db.ForeignKey("subject.id"))
     class_id = db.Column(db.Integer, db.ForeignKey("class.id"))
 
+class Day(db.Model):
+    __tablename__ = "day"
+
+    # the code stored in TimetableEntry.day_code
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(20), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f"<Day {self.id} {self.name}>"
+
+class TimeSlot(db.Model):
+    __tablename__ = "time_slot"
+
+    # the code stored in TimetableEntry.slot_code
+    id = db.Column(db.Integer, primary_key=True)
+    label = db.Column(db.String(30), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f"<TimeSlot {self.id} {self.label}>"
+
 class TimetableEntry(db.Model):
     __tablename__ = "timetable_entry"
 
@@ -102,8 +123,8 @@ class TimetableEntry(db.Model):
 
     lab_rooms = db.Column(db.String(200))
 
-    day = db.Column(db.String(20))
-    slot = db.Column(db.String(30))
+    day_code = db.Column(db.Integer, db.ForeignKey("day.id"))
+    slot_code = db.Column(db.Integer, db.ForeignKey("time_slot.id"))
 
     batch = db.Column(db.String(10))
 
@@ -116,9 +137,76 @@ class TimetableEntry(db.Model):
     teacher = db.relationship("Teacher")
     room = db.relationship("Room")
 
+    __table_args__ = (
+        db.Index(
+            "ix_timetable_entry_class_day_slot",
+            "class_id", "day_code", "slot_code"
+        ),
+        db.Index(
+            "ix_timetable_entry_teacher_day_slot",
+            "teacher_id", "day_code", "slot_code"
+        ),
+        db.Index("ix_timetable_entry_floating_room", "is_floating", "room_id"),
+    )
+
+    # labels are resolved from the in-process code table when rendering;
+    # imported here because timeslots imports this module
+    @property
+    def day(self):
+        from timeslots import slot_table
+        return slot_table.day_label(self.day_code)
+
+    @property
+    def slot(self):
+        from timeslots import slot_table
+        return slot_table.slot_label(self.slot_code)
+
     def __repr__(self):
         return f"<TimetableEntry {self.class_id} {self.day} {self.slot}>"
 
+class DatedRoom(db.Model):
+
+    __tablename__ = "dated_room"
+
+    # one row per entry whose room on a date differs from the weekly
+    # template (TimetableEntry.room_id); room_id None means no room
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    date = db.Column(db.Date, nullable=False)
+
+    entry_id = db.Column(
+        db.Integer, db.ForeignKey("timetable_entry.id"), nullable=False
+    )
+    room_id = db.Column(db.Integer, db.ForeignKey("room.id"), nullable=True)
+
+    __table_args__ = (
+        db.Index("uq_dated_room_date_entry", "date", "entry_id", unique=True),
+    )
+
+    def __repr__(self):
+        return f"<DatedRoom {self.date} {self.entry_id} {self.room_id}>"
+
+class LabRoomBooking(db.Model):
+
+    __tablename__ = "lab_room_booking"
+
+    # a room a lab entry uses, for the lab_rooms names that are rooms
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    entry_id = db.Column(
+        db.Integer, db.ForeignKey("timetable_entry.id"), nullable=False
+    )
+    room_id = db.Column(db.Integer, db.ForeignKey("room.id"), nullable=False)
+
+    __table_args__ = (
+        db.Index("uq_lab_room_booking_entry_room", "entry_id", "room_id", unique=True),
+    )
+
+    def __repr__(self):
+        return f"<LabRoomBooking {self.entry_id} {self.room_id}>"
+
 class CancelledClass(db.Model):
 
     __tablename__ = "cancelled_class"
@@ -135,7 +223,82 @@ class CancelledClass(db.Model):
 
     class_obj = db.relationship("Class")
 
+    __table_args__ = (
+        db.Index(
+            "uq_cancelled_class_class_slot_date", "class_id", "slot", "date",
+            unique=True
+        ),
+        db.Index("ix_cancelled_class_date", "date"),
+    )
+
     def __repr__(self):
         return f"<CancelledClass {self.class_id} {self.date} {self.slot}>"
 
 
+
+class TimetableVersion(db.Model):
+
+    __tablename__ = "timetable_version"
+
+    # a single row, id 1
+    id = db.Column(db.Integer, primary_key=True)
+
+    # bumped whenever entries or room assignments change
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    # random per database, set with the row; versions restart at 1 in a
+    # recreated database, so cached exports are keyed on both
+    token = db.Column(db.String(32), nullable=True)
+
+    def __repr__(self):
+        return f"<TimetableVersion {self.version}>"
+
+
+class SchemaMigration(db.Model):
+
+    __tablename__ = "schema_migration"
+
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SchemaMigration {self.version} {self.name}>"
+
+
+class Job(db.Model):
+
+    __tablename__ = "job"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    kind = db.Column(db.String(50), nullable=False)
+
+    # queued -> running -> done / failed
+    status = db.Column(db.String(20), nullable=False, default="queued")
+
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    message = db.Column(db.String(200), nullable=True)
+
+    error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "result": json.loads(self.result) if self.result else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind} {self.status}>"
@@ -0,0 +1,70 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Pools are started from request and job threads of a multi-threaded
+# server. A forked child inherits whatever locks other threads held at
+# that moment (the stdout lock in the middle of a print, say) and can
+# hang on them, so workers start from a clean server process instead.
+START_METHOD = (
+    "forkserver"
+    if "forkserver" in multiprocessing.get_all_start_methods()
+    else "spawn"
+)
+
+
+def pool_size(count, workers=None):
+    """
+    Processes worth starting for count independent items: workers, one
+    per CPU by default, but never more than there are items. 1 means the
+    items should run in this process.
+    """
+
+    return max(1, min(count, workers or os.cpu_count() or 1))
+
+
+def process_pool(workers, **kwargs):
+
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(START_METHOD),
+        **kwargs
+    )
+
+
+# set in each worker process by _init_worker
+_worker_fn = None
+
+
+def _init_worker(fn):
+
+    global _worker_fn
+
+    _worker_fn = fn
+
+
+def _call(item):
+
+    return _worker_fn(item)
+
+
+def parallel_map(fn, items, workers=None, min_items=2):
+    """
+    [fn(item) for item in items], spread over a process pool when there
+    are at least min_items and more than one worker to run them. fn is
+    sent to each worker once, so a functools.partial over a module-level
+    function can carry state shared by every item (a snapshot, say)
+    without pickling it per item. workers caps the pool.
+    """
+
+    items = list(items)
+    workers = pool_size(len(items), workers)
+
+    if workers == 1 or len(items) < min_items:
+        return [fn(item) for item in items]
+
+    chunksize = max(1, len(items) // (workers * 4))
+
+    with process_pool(workers, initializer=_init_worker, initargs=(fn,)) as pool:
+        return list(pool.map(_call, items, chunksize=chunksize))
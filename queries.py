@@ -0,0 +1,57 @@
+from sqlalchemy.orm import joinedload
+
+from models import db, DatedRoom, Room, TimetableEntry
+
+
+def timetable_entries(*criteria):
+    """
+    TimetableEntry query with class, subject, teacher and room loaded in
+    the same SELECT, so templates can follow those relationships without
+    a query per row.
+    """
+
+    return (
+        TimetableEntry.query
+        .options(
+            joinedload(TimetableEntry.class_obj),
+            joinedload(TimetableEntry.subject),
+            joinedload(TimetableEntry.teacher),
+            joinedload(TimetableEntry.room)
+        )
+        .filter(*criteria)
+    )
+
+
+def teacher_entries(teacher_id):
+
+    return (
+        timetable_entries(TimetableEntry.teacher_id == teacher_id)
+        .order_by(TimetableEntry.day_code, TimetableEntry.slot_code)
+        .all()
+    )
+
+
+def class_entries(class_id, ordered=True):
+
+    query = timetable_entries(TimetableEntry.class_id == class_id)
+
+    if ordered:
+        query = query.order_by(TimetableEntry.day_code, TimetableEntry.slot_code)
+
+    return query.all()
+
+
+def room_overrides(dates):
+    """
+    Rooms on dates that differ from the weekly template, as
+    {entry_id: room name or None}. An entry meets once a week, so a week
+    of dates never holds two overrides for the same entry.
+    """
+
+    rows = (
+        db.session.query(DatedRoom.entry_id, Room.name)
+        .outerjoin(Room, DatedRoom.room_id == Room.id)
+        .filter(DatedRoom.date.in_(list(dates)))
+    )
+
+    return dict(rows)
@@ -0,0 +1,135 @@
+from parallel import parallel_map
+
+
+def _hungarian(cost):
+    """
+    Minimum-cost assignment of every row to a distinct column.
+    Needs len(cost) <= len(cost[0]). Returns the column index for each row.
+    """
+
+    n = len(cost)
+    m = len(cost[0])
+    inf = float("inf")
+
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+
+        while True:
+
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            delta = inf
+            j1 = 0
+
+            for j in range(1, m + 1):
+
+                if used[j]:
+                    continue
+
+                cur = row[j - 1] - u[i0] - v[j]
+
+                if cur < minv[j]:
+                    minv[j] = cur
+                    way[j] = j0
+
+                if minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+
+            j0 = j1
+
+            if p[j0] == 0:
+                break
+
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+
+    match = [None] * n
+
+    for j in range(1, m + 1):
+        if p[j]:
+            match[p[j] - 1] = j - 1
+
+    return match
+
+
+def solve_slot(problem):
+    """
+    Solves one (day, slot) as a min-cost assignment.
+
+    problem is (key, entries, rooms) with entries as (entry_id, strength)
+    and rooms as (room_id, capacity). As many entries as possible get a
+    room, and among those assignments the total wasted capacity is the
+    smallest. Returns (key, {entry_id: room_id}).
+    """
+
+    key, entries, rooms = problem
+
+    if not entries or not rooms:
+        return key, {}
+
+    # Leaving an entry unallocated must cost more than any amount of
+    # wasted capacity, and a room that is too small must cost more still.
+    unallocated = 1 + sum(capacity for _, capacity in rooms)
+    too_small = unallocated * (len(entries) + 1)
+
+    cost = []
+
+    for _, strength in entries:
+
+        row = [
+            capacity - strength if capacity >= strength else too_small
+            for _, capacity in rooms
+        ]
+        row.extend([unallocated] * len(entries))
+
+        cost.append(row)
+
+    assigned = {}
+
+    for (entry_id, strength), j in zip(entries, _hungarian(cost)):
+
+        if j >= len(rooms):
+            continue
+
+        room_id, capacity = rooms[j]
+
+        if capacity >= strength:
+            assigned[entry_id] = room_id
+
+    return key, assigned
+
+
+def solve_slots(problems, workers=None):
+    """
+    Solves independent (day, slot) problems, spread over a process pool
+    when there is more than one. Returns {entry_id: room_id}.
+    """
+
+    assigned = {}
+
+    for _, slot_assigned in parallel_map(solve_slot, problems, workers):
+        assigned.update(slot_assigned)
+
+    return assigned
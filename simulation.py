@@ -0,0 +1,124 @@
+from functools import partial
+
+from allocator import load_snapshot
+from cancellations import cancellation_index
+from horizon import plan_dates, plan_date
+from parallel import parallel_map
+from timeslots import slot_table
+
+
+# below this many scenarios a process pool costs more than it saves
+PARALLEL_MIN = 16
+
+
+def cancellation_keys(cancellations):
+    """
+    (class_id, date, slot) hypothetical cancellations grouped per date as
+    the (class_id, day_code, slot_code) keys the allocator uses.
+    """
+
+    by_date = {}
+
+    for class_id, d, slot in cancellations:
+        by_date.setdefault(d, set()).add(
+            (class_id, slot_table.weekday_code(d), slot_table.slot_code(slot))
+        )
+
+    return by_date
+
+
+def _scenario_changes(snapshot, base, strategy, scenario):
+    """
+    Plans each date of the scenario on top of its real cancellations and
+    returns the entries whose room would differ from the rooms they have
+    on that date now, as (date, entry_id, before, after) room ids.
+    """
+
+    template = {e.id: e.room_id for e in snapshot.entries}
+
+    changes = []
+
+    for d, cancelled in sorted(scenario.items()):
+
+        real, current = base.get(d, (set(), {}))
+        after = plan_date(snapshot, real | cancelled, strategy)
+
+        for entry_id in current.keys() | after.keys():
+
+            before = current.get(entry_id, template[entry_id])
+            now = after.get(entry_id, template[entry_id])
+
+            if before != now:
+                changes.append((d, entry_id, before, now))
+
+    return changes
+
+
+def _report(snapshot, changes):
+
+    entries = {e.id: e for e in snapshot.entries}
+    rooms = snapshot.room_names
+
+    report = {"lost": 0, "gained": 0, "moved": 0, "changes": []}
+
+    for d, entry_id, before, now in changes:
+
+        e = entries[entry_id]
+
+        if now is None:
+            change = "lost"
+        elif before is None:
+            change = "gained"
+        else:
+            change = "moved"
+
+        report[change] += 1
+
+        report["changes"].append({
+            "entry_id": e.id,
+            "date": d.isoformat(),
+            "class": snapshot.class_names.get(e.class_id),
+            "day": slot_table.day_label(e.day_code),
+            "slot": slot_table.slot_label(e.slot_code),
+            "before": rooms.get(before),
+            "after": rooms.get(now),
+            "change": change
+        })
+
+    return report
+
+
+def simulate(scenarios, strategy="greedy", workers=None):
+    """
+    What-if runs of the allocator, with no writes.
+
+    Each scenario is an iterable of (class_id, date, slot) hypothetical
+    cancellations on top of the real ones of the same dates. Everything
+    runs against one in-memory snapshot of rooms and entries. Returns a
+    report per scenario, in order, listing the entries that would lose,
+    gain or move room on each date compared with the rooms they have.
+
+    Many scenarios are spread over a process pool; workers caps it.
+    """
+
+    scenarios = [cancellation_keys(s) for s in scenarios]
+
+    snapshot = load_snapshot()
+
+    # the real cancellations and current plan of every date involved
+    real = {
+        d: set(cancellation_index.on_date(d))
+        for scenario in scenarios
+        for d in scenario
+    }
+    plans = plan_dates(snapshot, real, strategy, workers=1)
+    base = {d: (real[d], plans[d]) for d in real}
+
+    results = parallel_map(
+        partial(_scenario_changes, snapshot, base, strategy),
+        scenarios,
+        workers=workers,
+        min_items=PARALLEL_MIN
+    )
+
+    return [_report(snapshot, changes) for changes in results]
@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pytest
+
+# the app modules live at the repository root, not in a package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# an in-memory database, set before app.py reads it
+os.environ["DATABASE_URL"] = "sqlite://"
+
+UPLOADS = os.path.join(ROOT, "uploads")
+
+
+def reset_caches():
+    """Drops every process-level cache built from the database."""
+
+    from cancellations import cancellation_index
+    from faculty_directory import invalidate_faculty_directory
+    from grid_cache import invalidate_floating_grid
+    from timeslots import slot_table
+
+    slot_table.invalidate()
+    cancellation_index.invalidate()
+    invalidate_floating_grid()
+    invalidate_faculty_directory()
+
+
+@pytest.fixture(scope="module")
+def app():
+
+    from app import app
+
+    app.config["TESTING"] = True
+
+    return app
+
+
+@pytest.fixture
+def empty_db(app):
+    """A new, empty schema for one test."""
+
+    from models import db
+
+    with app.app_context():
+
+        db.drop_all()
+        db.create_all()
+        reset_caches()
+
+        yield db
+
+        db.session.remove()
+
+
+def import_uploads(folder=UPLOADS):
+    """Runs an upload the way the upload job does."""
+
+    from allocator import allocate_rooms
+    from input_processor import process_inputs, provision_users
+    from workbook_loader import load_workbooks
+
+    plan = process_inputs(
+        load_workbooks(folder, workers=1, cache=False), differential=True
+    )
+    provision_users(plan)
+    allocate_rooms()
+
+
+@pytest.fixture(scope="module")
+def sample_db(app):
+    """The sample uploads imported and allocated, shared by a module."""
+
+    from migrations import run_migrations
+    from models import db
+
+    with app.app_context():
+
+        db.drop_all()
+        db.create_all()
+        reset_caches()
+        run_migrations()
+
+        import_uploads()
+
+        yield db
+
+        db.session.remove()
@@ -0,0 +1,77 @@
+from export_cache import (
+    bump_timetable_version, cached_export, export_etag, timetable_version
+)
+from models import db
+
+
+def build(content):
+
+    def write(target):
+        target.write(content)
+
+    return write
+
+
+def test_recreated_database_gets_a_new_version(empty_db):
+
+    assert timetable_version() == "0"
+
+    bump_timetable_version()
+    db.session.commit()
+    first = timetable_version()
+
+    db.drop_all()
+    db.create_all()
+
+    bump_timetable_version()
+    db.session.commit()
+    second = timetable_version()
+
+    assert first.split(".")[0] == second.split(".")[0] == "1"
+    assert first != second
+    assert export_etag("all-class", first) != export_etag("all-class", second)
+
+
+def test_artifacts_of_other_versions_are_evicted(empty_db, tmp_path):
+
+    bump_timetable_version()
+    db.session.commit()
+    old = timetable_version()
+
+    old_path = cached_export("all-class", old, "xlsx", build(b"old"), tmp_path)
+
+    db.drop_all()
+    db.create_all()
+
+    bump_timetable_version()
+    db.session.commit()
+    new = timetable_version()
+
+    new_path = cached_export("all-class", new, "xlsx", build(b"new"), tmp_path)
+
+    assert new_path != old_path
+    assert open(new_path, "rb").read() == b"new"
+    assert [p.name for p in tmp_path.iterdir()] == [new_path.rsplit("/", 1)[1]]
+
+
+def test_export_formats_have_their_own_etags(app, sample_db):
+
+    client = app.test_client()
+
+    with client.session_transaction() as s:
+        s["user_id"] = 1
+        s["role"] = "admin"
+
+    xlsx = client.get("/export_timetables?by=class")
+    zipped = client.get("/export_timetables?by=class&format=zip")
+
+    assert xlsx.status_code == zipped.status_code == 200
+    assert xlsx.get_etag() != zipped.get_etag()
+
+    again = client.get(
+        "/export_timetables?by=class&format=zip",
+        headers={"If-None-Match": xlsx.headers["ETag"]}
+    )
+
+    assert again.status_code == 200
+    assert again.data == zipped.data
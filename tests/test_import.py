@@ -0,0 +1,168 @@
+from datetime import date, timedelta
+
+from allocator import allocate_rooms
+from cancellations import cancellation_index
+from conftest import UPLOADS
+from horizon import allocate_dates, dates_in_slots, week_start
+from input_processor import get_class_column, process_inputs, provision_users
+from models import (
+    db, CancelledClass, Class, DatedRoom, LabRoomBooking, Teacher,
+    TimetableEntry, User
+)
+from timeslots import slot_table
+from workbook_loader import load_workbooks
+
+
+def reimport(frames):
+
+    provision_users(process_inputs(frames, differential=True))
+
+
+def get_page(app, user, path):
+
+    client = app.test_client()
+
+    with client.session_transaction() as s:
+        s["user_id"] = user.id
+        s["role"] = user.role
+
+    return client.get(path)
+
+
+def test_student_without_class_gets_a_message(app, sample_db):
+
+    student = User.query.filter(
+        User.role == "student", User.class_id.isnot(None)
+    ).first()
+    class_name = db.session.get(Class, student.class_id).name
+
+    frames = load_workbooks(UPLOADS, workers=1, cache=False)
+    strength = frames["class_strength"]
+    frames["class_strength"] = strength[
+        strength[get_class_column(strength)] != class_name
+    ]
+
+    process_inputs(frames, differential=True)
+
+    student = db.session.get(User, student.id)
+
+    assert student.class_id is None
+
+    response = get_page(app, student, "/student")
+
+    assert response.status_code == 200
+    assert b"not linked to a class" in response.data
+
+
+def test_reimport_relinks_accounts(app, sample_db):
+
+    full = load_workbooks(UPLOADS, workers=1, cache=False)
+    reimport(full)
+
+    student = User.query.filter(
+        User.role == "student", User.class_id.isnot(None)
+    ).first()
+    teacher = User.query.filter(
+        User.role == "teacher", User.teacher_id.isnot(None)
+    ).first()
+    class_name = db.session.get(Class, student.class_id).name
+    faculty = db.session.get(Teacher, teacher.teacher_id).name
+    passwords = (student.password_hash, teacher.password_hash)
+
+    frames = load_workbooks(UPLOADS, workers=1, cache=False)
+    strength = frames["class_strength"]
+    frames["class_strength"] = strength[
+        strength[get_class_column(strength)] != class_name
+    ]
+    mapping = frames["teacher_subject"]
+    frames["teacher_subject"] = mapping[
+        mapping["faculty"].astype(str).str.strip() != faculty
+    ]
+    reimport(frames)
+
+    assert db.session.get(User, student.id).class_id is None
+    assert db.session.get(User, teacher.id).teacher_id is None
+
+    reimport(full)
+
+    student = db.session.get(User, student.id)
+    teacher = db.session.get(User, teacher.id)
+
+    assert db.session.get(Class, student.class_id).name == class_name
+    assert db.session.get(Teacher, teacher.teacher_id).name == faculty
+    assert (student.password_hash, teacher.password_hash) == passwords
+
+    assert get_page(app, student, "/student").status_code == 200
+    assert get_page(app, teacher, "/teacher").status_code == 200
+
+
+def dated_rooms():
+
+    return {
+        (r.id, r.date, r.entry_id, r.room_id) for r in DatedRoom.query.all()
+    }
+
+
+def test_reimport_replans_only_changed_slots(app, sample_db):
+
+    full = load_workbooks(UPLOADS, workers=1, cache=False)
+    reimport(full)
+    allocate_rooms()
+
+    # the cell changed below is the first slot of the first sheet's first
+    # day; cancel half the classes there on that day next week
+    frames = load_workbooks(UPLOADS, workers=1, cache=False)
+    sheet = next(iter(frames["timetables"].values()))
+    day = slot_table.day_code(sheet.iloc[0, 0])
+    slot = slot_table.slot_code(sheet.columns[1])
+
+    d = week_start(date.today() + timedelta(weeks=1)) + timedelta(days=day - 1)
+    assert slot_table.weekday_code(d) == day
+
+    class_ids = sorted({
+        e.class_id
+        for e in TimetableEntry.query.filter_by(day_code=day, slot_code=slot)
+    })
+
+    for class_id in class_ids[::2]:
+        db.session.add(CancelledClass(
+            class_id=class_id, date=d, slot=slot_table.slot_label(slot)
+        ))
+
+    db.session.commit()
+    cancellation_index.invalidate()
+    allocate_dates()
+
+    before = dated_rooms()
+    bookings = {(b.id, b.entry_id, b.room_id) for b in LabRoomBooking.query.all()}
+
+    assert before and bookings
+
+    plan = process_inputs(load_workbooks(UPLOADS, workers=1, cache=False), differential=True)
+
+    # nothing changed, nothing rewritten
+    assert plan["changed_slots"] == set()
+    assert dated_rooms() == before
+    assert {(b.id, b.entry_id, b.room_id) for b in LabRoomBooking.query.all()} == bookings
+
+    # one timetable cell changed
+    sheet.iloc[0, 1] = sheet.iloc[0, 2]
+
+    plan = process_inputs(frames, differential=True)
+    changed = plan["changed_slots"]
+
+    assert changed == {(day, slot)}
+
+    assert dates_in_slots(changed) == [d]
+
+    allocate_rooms([
+        (slot_table.day_label(day), slot_table.slot_label(slot))
+        for day, slot in changed
+    ])
+    allocate_dates([d])
+    partial = {row[1:] for row in dated_rooms()}
+
+    allocate_rooms()
+    allocate_dates()
+
+    assert partial == {row[1:] for row in dated_rooms()}
@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from cancellations import cancellation_index
+from models import db, CancelledClass, TimetableEntry
+from timeslots import slot_table
+
+
+HOT_FILTERS = [
+    (
+        "ix_timetable_entry_class_day_slot",
+        "SELECT * FROM timetable_entry "
+        "WHERE class_id = 1 AND day_code = 1 AND slot_code = 1"
+    ),
+    (
+        "ix_timetable_entry_teacher_day_slot",
+        "SELECT * FROM timetable_entry "
+        "WHERE teacher_id = 1 AND day_code = 1 AND slot_code = 1"
+    ),
+    (
+        "ix_timetable_entry_floating_room",
+        "SELECT * FROM timetable_entry WHERE is_floating = 1 AND room_id = 1"
+    ),
+    (
+        "ix_cancelled_class_date",
+        "SELECT * FROM cancelled_class WHERE date >= '2026-01-01'"
+    ),
+    (
+        "uq_cancelled_class_class_slot_date",
+        "SELECT * FROM cancelled_class "
+        "WHERE class_id = 1 AND slot = '9:00-10:00' AND date = '2026-01-05'"
+    ),
+]
+
+
+@pytest.mark.parametrize("index, query", HOT_FILTERS, ids=[i for i, _ in HOT_FILTERS])
+def test_hot_filter_uses_index(sample_db, index, query):
+
+    plan = " ".join(
+        row[-1]
+        for row in db.session.execute(text("EXPLAIN QUERY PLAN " + query))
+    )
+
+    assert "SEARCH" in plan
+    assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan
+
+
+def test_cancel_class_skips_duplicate_slots(app, sample_db):
+
+    entry = TimetableEntry.query.filter(TimetableEntry.slot_code.isnot(None)).first()
+    slots = sorted({
+        slot_table.slot_label(e.slot_code)
+        for e in TimetableEntry.query.filter_by(class_id=entry.class_id)
+        if e.slot_code is not None
+    })[:3]
+
+    assert len(slots) == 3
+
+    d = date.today() + timedelta(days=1)
+
+    client = app.test_client()
+
+    with client.session_transaction() as s:
+        s["user_id"] = 1
+        s["role"] = "admin"
+
+    def cancel(*posted):
+        response = client.post("/admin/cancel_class", data={
+            "class_id": entry.class_id,
+            "date": d.isoformat(),
+            "slots": list(posted),
+            "reason": "test"
+        })
+        assert response.status_code == 302
+
+    def cancelled():
+        return CancelledClass.query.filter_by(class_id=entry.class_id, date=d)
+
+    cancel(slots[0], slots[1])
+
+    assert cancelled().count() == 2
+
+    # one new slot among repeats of both earlier ones and of itself
+    cancel(slots[1], slots[2], slots[0], slots[2])
+
+    assert cancelled().count() == 3
+    assert sorted(c.slot for c in cancelled()) == sorted(slots)
+    assert len([
+        key for key in cancellation_index.on_date(d)
+        if key[0] == entry.class_id
+    ]) == 3
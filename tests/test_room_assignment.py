@@ -0,0 +1,88 @@
+import random
+from itertools import permutations
+
+import pytest
+
+from room_assignment import _hungarian, solve_slot, solve_slots
+
+
+def brute_force_cost(cost):
+    """Smallest total cost over every assignment of rows to columns."""
+
+    n = len(cost)
+
+    return min(
+        sum(cost[i][j] for i, j in enumerate(columns))
+        for columns in permutations(range(len(cost[0])), n)
+    )
+
+
+def brute_force_slot(entries, rooms):
+    """(entries placed, wasted capacity) of the best possible plan."""
+
+    best = (0, 0)
+
+    for size in range(len(entries) + 1):
+        for chosen in permutations(range(len(rooms)), size):
+            for placed in permutations(range(len(entries)), size):
+
+                pairs = list(zip(placed, chosen))
+
+                if any(rooms[r][1] < entries[e][1] for e, r in pairs):
+                    continue
+
+                waste = sum(rooms[r][1] - entries[e][1] for e, r in pairs)
+
+                if (size, -waste) > (best[0], -best[1]):
+                    best = (size, waste)
+
+    return best
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_hungarian_matches_brute_force(seed):
+
+    rng = random.Random(seed)
+
+    n = rng.randint(1, 5)
+    m = rng.randint(n, 6)
+    cost = [[rng.randint(0, 20) for _ in range(m)] for _ in range(n)]
+
+    match = _hungarian(cost)
+
+    assert len(set(match)) == n
+    assert all(0 <= j < m for j in match)
+    assert sum(cost[i][j] for i, j in enumerate(match)) == brute_force_cost(cost)
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_solve_slot_matches_brute_force(seed):
+
+    rng = random.Random(seed)
+
+    entries = [(100 + i, rng.randint(20, 70)) for i in range(rng.randint(1, 4))]
+    rooms = [(200 + j, rng.randint(20, 70)) for j in range(rng.randint(0, 4))]
+
+    key, assigned = solve_slot(("key", entries, rooms))
+
+    strengths = dict(entries)
+    capacities = dict(rooms)
+
+    assert key == "key"
+    assert len(set(assigned.values())) == len(assigned)
+    assert all(capacities[r] >= strengths[e] for e, r in assigned.items())
+
+    waste = sum(capacities[r] - strengths[e] for e, r in assigned.items())
+
+    assert (len(assigned), waste) == brute_force_slot(entries, rooms)
+
+
+def test_solve_slots_merges_every_slot():
+
+    problems = [
+        ((1, 1), [(1, 30), (2, 60)], [(10, 60), (11, 40)]),
+        ((1, 2), [(3, 50)], [(10, 60)]),
+        ((1, 3), [(4, 90)], [(10, 60)])
+    ]
+
+    assert solve_slots(problems, workers=1) == {1: 11, 2: 10, 3: 10}
@@ -0,0 +1,101 @@
+from input_processor import sync_table
+from models import Room
+
+
+def rooms():
+
+    return sorted(
+        (r.name, r.capacity, r.is_permanent, r.id) for r in Room.query.all()
+    )
+
+
+def room(name, capacity, is_permanent=False):
+
+    return {
+        "name": name,
+        "owner_class_id": None,
+        "capacity": capacity,
+        "is_permanent": is_permanent
+    }
+
+
+def sync(rows):
+
+    return sync_table(
+        Room, rows, ["name", "owner_class_id"], ["capacity", "is_permanent"]
+    )
+
+
+def test_first_sync_inserts_everything(empty_db):
+
+    rows = [room("A101", 60), room("A102", 40)]
+
+    inserted, updated, deleted = sync(rows)
+
+    assert (len(inserted), len(updated), len(deleted)) == (2, 0, 0)
+    assert all(r["id"] for r in rows)
+    assert rooms() == [
+        ("A101", 60, False, rows[0]["id"]),
+        ("A102", 40, False, rows[1]["id"])
+    ]
+
+
+def test_round_trip_writes_only_the_difference(empty_db):
+
+    first = [room("A101", 60), room("A102", 40), room("A103", 30)]
+    sync(first)
+    ids = {r["name"]: r["id"] for r in first}
+
+    # A101 unchanged, A102 grows, A103 dropped, A104 new
+    second = [room("A101", 60), room("A102", 45), room("A104", 70)]
+
+    inserted, updated, deleted = sync(second)
+
+    assert [r["name"] for r in inserted] == ["A104"]
+    assert updated == [{"capacity": 45, "id": ids["A102"]}]
+    assert deleted == [ids["A103"]]
+
+    assert rooms() == [
+        ("A101", 60, False, ids["A101"]),
+        ("A102", 45, False, ids["A102"]),
+        ("A104", 70, False, second[2]["id"])
+    ]
+
+    # the same data again is a no-op
+    inserted, updated, deleted = sync(
+        [room("A101", 60), room("A102", 45), room("A104", 70)]
+    )
+
+    assert (inserted, updated, deleted) == ([], [], [])
+
+
+def test_duplicate_keys_are_paired_in_id_order(empty_db):
+
+    first = [room("LAB", 30), room("LAB", 40), room("LAB", 50)]
+    sync(first)
+
+    second = [room("LAB", 35), room("LAB", 40)]
+
+    inserted, updated, deleted = sync(second)
+
+    assert inserted == []
+    assert [r["id"] for r in second] == [first[0]["id"], first[1]["id"]]
+    assert updated == [{"capacity": 35, "id": first[0]["id"]}]
+    assert deleted == [first[2]["id"]]
+    assert rooms() == [
+        ("LAB", 35, False, first[0]["id"]),
+        ("LAB", 40, False, first[1]["id"])
+    ]
+
+
+def test_missing_update_field_is_left_alone(empty_db):
+
+    sync([room("A101", 60, is_permanent=True)])
+
+    row = {"name": "A101", "owner_class_id": None, "capacity": 65}
+
+    inserted, updated, deleted = sync([row])
+
+    assert (inserted, deleted) == ([], [])
+    assert updated == [{"capacity": 65, "id": row["id"]}]
+    assert rooms() == [("A101", 65, True, row["id"])]
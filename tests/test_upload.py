@@ -0,0 +1,62 @@
+import os
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import app as app_module
+from conftest import UPLOADS
+from models import Job
+from workbook_loader import UPLOAD_FILES
+
+
+@pytest.fixture
+def upload(app, empty_db, tmp_path, monkeypatch):
+    """Posts the sample workbooks to /admin_upload with uploads in tmp_path."""
+
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path))
+
+    client = app.test_client()
+
+    with client.session_transaction() as s:
+        s["user_id"] = 1
+        s["role"] = "admin"
+
+    def post():
+        files = {
+            key: (open(os.path.join(UPLOADS, filename), "rb"), filename)
+            for key, filename in UPLOAD_FILES.items()
+        }
+        return client.post("/admin_upload", data=files)
+
+    return post
+
+
+def test_failed_save_leaves_no_job(upload, tmp_path, monkeypatch):
+
+    def broken_save(self, dst, *args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(FileStorage, "save", broken_save)
+
+    with pytest.raises(OSError):
+        upload()
+
+    assert Job.query.count() == 0
+    assert os.listdir(tmp_path / "jobs") == []
+
+
+def test_job_that_cannot_start_is_failed(upload, tmp_path, monkeypatch):
+
+    def broken_start(app, job, fn):
+        raise RuntimeError("executor shut down")
+
+    monkeypatch.setattr(app_module, "start_job", broken_start)
+
+    with pytest.raises(RuntimeError):
+        upload()
+
+    (job,) = Job.query.all()
+
+    assert job.status == "failed"
+    assert "executor shut down" in job.message
+    assert os.listdir(tmp_path / "jobs") == []
@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models import db, User
+
+
+WRITES = ("INSERT", "UPDATE", "DELETE")
+
+
+@pytest.mark.parametrize("role, path", [
+    ("teacher", "/teacher"),
+    ("student", "/student"),
+])
+def test_timetable_views_only_read(app, sample_db, role, path):
+
+    user = User.query.filter_by(role=role).filter(
+        (User.teacher_id if role == "teacher" else User.class_id).isnot(None)
+    ).first()
+
+    client = app.test_client()
+
+    with client.session_transaction() as s:
+        s["user_id"] = user.id
+        s["role"] = role
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.lstrip().split(None, 1)[0].upper())
+
+    event.listen(db.engine, "before_cursor_execute", record)
+
+    try:
+        for week in (date.today(), date.today() + timedelta(weeks=2)):
+            response = client.get(f"{path}?week={week.isoformat()}")
+            assert response.status_code == 200
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    assert statements
+    assert not [s for s in statements if s in WRITES]
@@ -0,0 +1,34 @@
+import os
+import pickle
+import shutil
+
+import pytest
+
+from conftest import UPLOADS
+from workbook_loader import UPLOAD_FILES, load_workbooks
+
+
+@pytest.mark.parametrize("content", [
+    b"",
+    b"not a pickle",
+    b"cworkbook_loader\nno_such_name\n.",
+    b"cno_such_module\nno_such_name\n.",
+], ids=["empty", "garbage", "missing-attribute", "missing-module"])
+def test_unreadable_cache_entry_is_a_miss(tmp_path, content):
+
+    name = "class_strength"
+    shutil.copy(os.path.join(UPLOADS, UPLOAD_FILES[name]), tmp_path)
+    cache_dir = tmp_path / "cache"
+
+    expected = load_workbooks(tmp_path, [name], workers=1, cache_dir=cache_dir)[name]
+
+    (entry,) = cache_dir.iterdir()
+    entry.write_bytes(content)
+
+    loaded = load_workbooks(tmp_path, [name], workers=1, cache_dir=cache_dir)[name]
+
+    assert loaded.equals(expected)
+
+    # parsed again and the entry rewritten
+    with open(entry, "rb") as f:
+        assert pickle.load(f).equals(expected)
@@ -0,0 +1,155 @@
+import threading
+
+from models import db, Day, TimeSlot
+from utils.normalize import normalize_slot
+
+
+TIME_SLOTS = list(map(normalize_slot, [
+    "8.00-8.45",
+    "9.10-9.55",
+    "10.00-10.45",
+    "10.50-11.35",
+    "11.55-12.40",
+    "12.45-1.30"
+]))
+
+DAYS = [
+    "MONDAY", "TUESDAY", "WEDNESDAY",
+    "THURSDAY", "FRIDAY", "SATURDAY"
+]
+
+
+def normalize_day(day):
+
+    if day is None:
+        return None
+
+    return str(day).strip().upper()
+
+
+class SlotTable:
+    """
+    Small integer codes for days and time slots, backed by the day and
+    time_slot tables. DAYS and TIME_SLOTS always get the first codes in
+    order, so sorting by code sorts chronologically; other labels met at
+    import are appended after them.
+
+    Labels are normalized only when they are looked up by label, which
+    happens at ingest. Everything else compares codes and turns them
+    back into labels when rendering.
+    """
+
+    def __init__(self):
+
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    def invalidate(self):
+
+        with self._lock:
+            self._loaded = False
+
+    def _ensure_loaded(self):
+
+        if self._loaded:
+            return
+
+        with self._lock:
+
+            if self._loaded:
+                return
+
+            self._day_codes = dict(db.session.query(Day.name, Day.id))
+            self._slot_codes = dict(db.session.query(TimeSlot.label, TimeSlot.id))
+
+            self._day_labels = {v: k for k, v in self._day_codes.items()}
+            self._slot_labels = {v: k for k, v in self._slot_codes.items()}
+
+            self._loaded = True
+
+    def register(self, days=(), slots=()):
+        """
+        Gives codes to the labels that have none yet, after the canonical
+        DAYS and TIME_SLOTS, and commits them. Codes are never reused or
+        removed, so this is safe to call before the rest of an import.
+        """
+
+        self._ensure_loaded()
+
+        with self._lock:
+
+            new_days = [
+                day
+                for day in dict.fromkeys(map(normalize_day, [*DAYS, *days]))
+                if day and day not in self._day_codes
+            ]
+
+            new_slots = [
+                slot
+                for slot in dict.fromkeys(map(normalize_slot, [*TIME_SLOTS, *slots]))
+                if slot and slot not in self._slot_codes
+            ]
+
+            if not new_days and not new_slots:
+                return
+
+            day_rows = [Day(name=day) for day in new_days]
+            slot_rows = [TimeSlot(label=slot) for slot in new_slots]
+
+            db.session.add_all(day_rows + slot_rows)
+            db.session.commit()
+
+            for row in day_rows:
+                self._day_codes[row.name] = row.id
+                self._day_labels[row.id] = row.name
+
+            for row in slot_rows:
+                self._slot_codes[row.label] = row.id
+                self._slot_labels[row.id] = row.label
+
+    def day_code(self, day):
+
+        self._ensure_loaded()
+
+        code = self._day_codes.get(day)
+
+        if code is None:
+            code = self._day_codes.get(normalize_day(day))
+
+        return code
+
+    def slot_code(self, slot):
+
+        self._ensure_loaded()
+
+        code = self._slot_codes.get(slot)
+
+        if code is None:
+            code = self._slot_codes.get(normalize_slot(slot))
+
+        return code
+
+    def weekday_code(self, d):
+        """Code of the weekday a date falls on."""
+
+        return self.day_code(d.strftime("%A").upper())
+
+    def key(self, day, slot):
+        """(day code, slot code) for a day and slot label."""
+
+        return self.day_code(day), self.slot_code(slot)
+
+    def day_label(self, code):
+
+        self._ensure_loaded()
+
+        return self._day_labels.get(code)
+
+    def slot_label(self, code):
+
+        self._ensure_loaded()
+
+        return self._slot_labels.get(code)
+
+
+slot_table = SlotTable()
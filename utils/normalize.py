@@ -1,21 +1,20 @@
 # utils/normalize.py
 
 import re
+from functools import lru_cache
 
+import pandas as pd
 
-def normalize_slot(slot):
-    """
-    Normalizes all slot formats to ONE canonical form.
 
-    Examples handled:
-    - "10.50-11.35"
-    - "10.50_-_11.35"
-    - "10.50 _ - _ 11.35"
-    - "10:50-11:35"
-    """
+_SPACES = re.compile(r"\s+")
+_DASHES = re.compile(r"[-–—]+")
+_UNDERSCORES = re.compile(r"_+")
 
-    if slot is None:
-        return None
+# distinct raw slots and subjects number in the hundreds at most
+MEMO_SIZE = 4096
+
+
+def _normalize_slot(slot):
 
     s = str(slot).strip()
 
@@ -23,13 +22,13 @@ def normalize_slot(slot):
     s = s.replace(":", ".")
 
     # Remove all spaces
-    s = re.sub(r"\s+", "", s)
+    s = _SPACES.sub("", s)
 
     # Replace any variant of '-' with '_-_'
-    s = re.sub(r"[-–—]+", "_-_", s)
+    s = _DASHES.sub("_-_", s)
 
     # Collapse multiple underscores
-    s = re.sub(r"_+", "_", s)
+    s = _UNDERSCORES.sub("_", s)
 
     # Final safety
     s = s.strip("_")
@@ -37,15 +36,112 @@ def normalize_slot(slot):
     return s
 
 
+def _normalize_subject(subject):
+
+    s = str(subject).strip()
+    s = _SPACES.sub(" ", s)
+    return s.upper()
+
+
+# typed, so 1 and 1.0 (which print differently) are memoized apart
+_memo_slot = lru_cache(maxsize=MEMO_SIZE, typed=True)(_normalize_slot)
+_memo_subject = lru_cache(maxsize=MEMO_SIZE, typed=True)(_normalize_subject)
+
+
+def _memoized(memo, normalize, value):
+
+    if value is None:
+        return None
+
+    try:
+        return memo(value)
+    except TypeError:
+        # unhashable input, nothing to key the memo on
+        return normalize(value)
+
+
+def normalize_slot(slot):
+    """
+    Normalizes all slot formats to ONE canonical form.
+
+    Examples handled:
+    - "10.50-11.35"
+    - "10.50_-_11.35"
+    - "10.50 _ - _ 11.35"
+    - "10:50-11:35"
+
+    Results are memoized on the raw input.
+    """
+
+    return _memoized(_memo_slot, _normalize_slot, slot)
+
+
 def normalize_subject(subject):
     """
     Normalizes subject names.
     Keeps slashes for parallel detection.
+    Results are memoized on the raw input.
     """
 
-    if subject is None:
-        return None
+    return _memoized(_memo_subject, _normalize_subject, subject)
 
-    s = str(subject).strip()
-    s = re.sub(r"\s+", " ", s)
-    return s.upper()
+
+def _normalize_many(values, normalize):
+    """
+    Normalizes a pandas Series or any iterable in one call, each distinct
+    value once. A Series comes back as a Series on the same index with
+    missing values as None; anything else comes back as a list.
+    """
+
+    if not isinstance(values, pd.Series):
+        return [normalize(v) for v in values]
+
+    uniques = values.dropna().unique()
+
+    return values.map(
+        {value: normalize(value) for value in uniques}
+    ).astype(object).where(values.notna(), None)
+
+
+def normalize_slots(values):
+    """
+    Batch normalize_slot() for a pandas Series or a list.
+    """
+
+    return _normalize_many(values, normalize_slot)
+
+
+def normalize_subjects(values):
+    """
+    Batch normalize_subject() for a pandas Series or a list.
+    """
+
+    return _normalize_many(values, normalize_subject)
+
+
+def split_lab_rooms(value):
+    """
+    Room names in a lab_rooms cell, e.g. "A401, A507" -> ["A401", "A507"],
+    in order and without repeats. Missing or blank cells give [].
+    """
+
+    if value is None or pd.isna(value):
+        return []
+
+    names = (name.strip() for name in str(value).split(","))
+
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def normalize_columns(df):
+    """
+    Lower-cases and snake_cases the column headers of a DataFrame.
+    """
+
+    df.columns = (
+        df.columns.astype(str)
+        .str.strip()
+        .str.lower()
+        .str.replace(" ", "_")
+    )
+    return df
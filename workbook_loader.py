@@ -0,0 +1,195 @@
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+from parallel import parallel_map
+from utils.normalize import normalize_columns
+
+
+# upload form field -> file name in the upload folder
+UPLOAD_FILES = {
+    "class_strength": "class_strength.xlsx",
+    "room_mapping": "room_mapping.xlsx",
+    "class_type": "class_type.xlsx",
+    "teacher_subject": "teacher_subject_mapping.xlsx",
+    "parallel_classes": "parallel_classes.xlsx",
+    "student_mapping": "student_mapping.xlsx",
+    "timetables": "timetables.xlsx",
+    "lab_rooms": "lab_rooms.xlsx"
+}
+
+# workbooks where every sheet is needed, not just the first one
+MULTI_SHEET = {"timetables"}
+
+OPTIONAL = {"lab_rooms"}
+
+CACHE_DIR = ".cache"
+
+# parsed workbooks kept in the cache, least recently used evicted first
+CACHE_SIZE = 32
+
+# bump when read_workbook() output changes so old cache entries are ignored
+CACHE_FORMAT = 1
+
+
+def read_workbook(path, all_sheets=False):
+    """
+    Parses one workbook in a single pass. Returns a DataFrame for the
+    first sheet, or {sheet name: DataFrame} when all_sheets is set.
+    Column headers are normalized either way.
+    """
+
+    if all_sheets:
+        sheets = pd.read_excel(path, sheet_name=None)
+        return {
+            name: normalize_columns(df)
+            for name, df in sheets.items()
+        }
+
+    return normalize_columns(pd.read_excel(path))
+
+
+def _read_job(job):
+
+    path, all_sheets = job
+
+    return read_workbook(path, all_sheets)
+
+
+def file_digest(path):
+
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _cache_path(cache_dir, digest, all_sheets):
+
+    sheets = "all" if all_sheets else "first"
+
+    return os.path.join(
+        cache_dir, f"{digest}-{sheets}-v{CACHE_FORMAT}.pkl"
+    )
+
+
+def _read_cached(path):
+
+    try:
+        with open(path, "rb") as f:
+            parsed = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+
+        # truncated, or pickled by another pandas or numpy version
+        # (AttributeError, ModuleNotFoundError, TypeError...); drop it so
+        # the workbook is parsed and cached again
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+        return None
+
+    # mtime doubles as the last-used time for LRU eviction
+    os.utime(path)
+
+    return parsed
+
+
+def _write_cached(path, parsed):
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        pickle.dump(parsed, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.replace(tmp_path, path)
+
+
+def _evict(cache_dir, keep=CACHE_SIZE):
+
+    entries = [
+        os.path.join(cache_dir, name)
+        for name in os.listdir(cache_dir)
+        if name.endswith(".pkl")
+    ]
+
+    entries.sort(key=os.path.getmtime, reverse=True)
+
+    for path in entries[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def load_workbooks(folder="uploads", names=None, workers=None, cache=True,
+                   cache_dir=None):
+    """
+    Reads the upload workbooks in a process pool, each one exactly once.
+
+    openpyxl parsing is CPU-bound, so the files are spread over processes
+    rather than threads. Parsed workbooks are cached in cache_dir (by
+    default <folder>/.cache) keyed by a hash of the file contents, so a
+    re-uploaded file that did not change is not parsed again.
+
+    Returns {form field: parsed workbook}; optional workbooks that were
+    not uploaded are left out.
+    """
+
+    names = list(names or UPLOAD_FILES)
+    cache_dir = cache_dir or os.path.join(folder, CACHE_DIR)
+
+    if cache:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    loaded = {}
+    cache_paths = {}
+    jobs = {}
+
+    for name in names:
+
+        path = os.path.join(folder, UPLOAD_FILES[name])
+
+        if not os.path.exists(path):
+
+            if name in OPTIONAL:
+                continue
+
+            raise FileNotFoundError(path)
+
+        all_sheets = name in MULTI_SHEET
+
+        if cache:
+
+            cache_paths[name] = _cache_path(
+                cache_dir, file_digest(path), all_sheets
+            )
+
+            parsed = _read_cached(cache_paths[name])
+
+            if parsed is not None:
+                loaded[name] = parsed
+                continue
+
+        jobs[name] = (path, all_sheets)
+
+    parsed = dict(zip(jobs, parallel_map(_read_job, jobs.values(), workers)))
+
+    if cache and parsed:
+
+        for name, frames in parsed.items():
+            _write_cached(cache_paths[name], frames)
+
+        _evict(cache_dir)
+
+    loaded.update(parsed)
+
+    return {name: loaded[name] for name in names if name in loaded}